@@ -1,93 +1,155 @@
 import streamlit as st
-import pandas as pd
 import io
-import random
 import os
 import re
-from streamlit.components.v1 import html
-from logic import perform_gacha_draw, GachaHistoryTracker
-from logic.tracker import GachaHistoryTracker
-from logic.gacha_engine import perform_gacha_draw
-import numpy as np
+from logic.tracker import GachaHistoryTracker, entry_key, entry_tp_delta
+from logic.gacha_engine import DrawConfig, GachaEngine
+from logic.catalog import invalidate_catalog
+from logic.records import records_from_entries, records_to_columns
+from logic.stats import PullStats
+from logic.versions import get_version_store
+from logic.utils import PRESETS, TIERS, get_tier_and_color, classify_luck
+from logic import instrument
+from logic.instrument import RunProfiler
 import math
-import altair as alt
 import time
+import json
 
-tracker = GachaHistoryTracker()
+# pandas, numpy, altair y pyarrow se importan solo en las secciones que los usan
+# (importación/exportación, tiradas grandes, Bell Curve): el arranque en frío no los paga.
+# Presupuesto medido con: python -m benchmarks.import_time
 
 # ------------------ CONFIG ------------------
 st.set_page_config(page_title="Chaos Gacha Web", layout="wide")
 
+# Un tracker por sesión; "?user=<nombre>" en la URL separa los datos por usuario
+if "tracker" not in st.session_state:
+    st.session_state["tracker"] = GachaHistoryTracker(profile=st.query_params.get("user"))
+tracker = st.session_state["tracker"]
+
+# ------------------ DEBUG METRICS ------------------
+# Los controles se dibujan al final del sidebar; aquí solo se lee su estado para medir todo el rerun
+debug_metrics = st.session_state.get("debug_metrics", st.query_params.get("debug") == "1")
+metrics = None
+run_profiler = None
+
+# Un rerun interrumpido por una excepción puede dejar un profiler activo
+leftover_profiler = st.session_state.pop("debug_profiler", None)
+if leftover_profiler is not None:
+    leftover_profiler.stop()
+
+if debug_metrics:
+    rerun_start = time.perf_counter()
+    metrics = instrument.activate()
+    if st.session_state.get("debug_cprofile") or st.session_state.get("debug_tracemalloc"):
+        run_profiler = RunProfiler(cpu=bool(st.session_state.get("debug_cprofile")),
+                                   memory=bool(st.session_state.get("debug_tracemalloc"))).start()
+        st.session_state["debug_profiler"] = run_profiler
+else:
+    instrument.deactivate()
+
 # ------------------ LOAD EXISTING HISTORY ------------------
 st.sidebar.header("📂 Load Previous History")
 
-uploaded_file = st.sidebar.file_uploader("Upload history CSV (UTF-8)", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload history CSV (UTF-8) or Parquet", type=["csv", "parquet"])
 manual_csv = st.sidebar.text_area("📋 Or paste CSV content manually", key="manual_csv")
 
 if "log" not in st.session_state:
     st.session_state["log"] = []
 
-def load_csv_data(content: str):
-    global tracker
-    try:
-        # Detectar separador probable
-        if "\t" in content:
-            sep = "\t"
-        elif ";" in content:
-            sep = ";"
-        else:
-            sep = ","
-
-        df_loaded = pd.read_csv(io.StringIO(content), sep=sep)
-
-        # Si solo hay una columna, forzar con tab
-        if len(df_loaded.columns) == 1:
-            df_loaded = pd.read_csv(io.StringIO(content), sep="\t")
-
-        required_cols = {"Type", "Element", "Rarity", "Tier", "Luck", "Description", "Color"}
-        if required_cols.issubset(df_loaded.columns):
+# Estadísticas acumuladas: se actualizan por tirada en lugar de recorrer el historial en cada rerun
+if "pull_stats" not in st.session_state:
+    st.session_state["pull_stats"] = PullStats()
+pull_stats = st.session_state["pull_stats"]
 
-            # 🔧 LIMPIAR columnas antes de pasar al tracker
-            df_loaded["Rarity"] = pd.to_numeric(df_loaded["Rarity"], errors="coerce")
-            df_loaded["Luck"] = df_loaded["Luck"].astype(str).str.replace('%', '', regex=False)
-            df_loaded["Luck"] = pd.to_numeric(df_loaded["Luck"], errors="coerce")
+def load_csv_data(stream, total_bytes=None, position=None):
+    from logic.history_io import open_history_csv
 
-            if "Notes" in df_loaded.columns:
-                df_loaded["Notes"] = df_loaded["Notes"].fillna("").astype(str)
-            else:
-                df_loaded["Notes"] = ""
+    # Progreso según los bytes ya consumidos del archivo
+    progress_fn = (lambda rows: position() / total_bytes) if total_bytes and position is not None else None
+    load_history_data(lambda: open_history_csv(stream), progress_fn)
 
-            if any("���" in note for note in df_loaded["Notes"]):
-                st.sidebar.warning("⚠️ Some notes contain unreadable characters (���). This may affect TP calculation.")
+def load_parquet_data(stream):
+    from logic.history_io import open_history_parquet, parquet_row_count
 
-            # Guardar en sesión
-            st.session_state["log"] = df_loaded.to_dict(orient="records")
+    total = {}
 
-            # ✅ Tracker debe cargarse DESPUÉS de limpiar
-            tracker.load_from_log(st.session_state["log"])
+    def open_chunks():
+        total["rows"] = parquet_row_count(stream)
+        stream.seek(0)
+        return open_history_parquet(stream)
 
-            st.sidebar.success("✅ History loaded successfully.")
+    load_history_data(open_chunks, lambda rows: rows / total["rows"] if total["rows"] else 1.0)
 
-            # 🧹 Limpiar textarea para evitar recarga infinita
-            st.session_state["manual_csv"] = ""
+def load_history_data(open_chunks, progress_fn=None):
+    global tracker, pull_stats
+    from logic.history_io import HistoryFormatError
 
-        else:
-            missing = required_cols - set(df_loaded.columns)
-            st.sidebar.error(f"❌ Invalid CSV format. Missing columns: {', '.join(missing)}")
-            st.sidebar.write("🔎 Columns found:", list(df_loaded.columns))
-            st.sidebar.dataframe(df_loaded.head())
+    progress = st.sidebar.progress(0.0, text="Importing history...")
+    try:
+        # La cabecera se valida al abrir: un archivo inválido no llega a tocar el tracker
+        chunks = open_chunks()
+        log = []
+        stats = PullStats()
+        keys, points = set(), 0
+        unreadable_notes = False
+
+        # Importación por bloques sin cargar todo el texto; repetidos y TP se acumulan aquí y se
+        # escriben de una vez al final, así un error en el bloque N no deja el tracker a medias
+        for chunk in chunks:
+            unreadable_notes = unreadable_notes or chunk["Notes"].str.contains("���", regex=False).any()
+            entries = chunk.to_dict(orient="records")
+            keys.update(entry_key(entry) for entry in entries)
+            points += sum(entry_tp_delta(entry) for entry in entries)
+            # En sesión solo se guardan registros compactos, no los dicts con texto
+            records = records_from_entries(entries)
+            log.extend(records)
+            stats.add_many(records)
+
+            if progress_fn is not None:
+                progress.progress(min(1.0, progress_fn(len(log))), text=f"Imported {len(log):,} rows...")
+
+        tracker.replace_all(keys, points)
+
+        if unreadable_notes:
+            st.sidebar.warning("⚠️ Some notes contain unreadable characters (���). This may affect TP calculation.")
+
+        # Guardar en sesión
+        st.session_state["log"] = log
+        st.session_state["history_html_cache"] = {}
+        st.session_state["pull_stats"] = pull_stats = stats
+
+        progress.progress(1.0, text=f"Imported {len(log):,} rows.")
+        st.sidebar.success("✅ History loaded successfully.")
+
+        # 🧹 Limpiar textarea para evitar recarga infinita
+        st.session_state["manual_csv"] = ""
+
+    except HistoryFormatError as e:
+        progress.empty()
+        st.sidebar.error(f"❌ Invalid history format. Missing columns: {', '.join(sorted(e.missing))}")
+        st.sidebar.write("🔎 Columns found:", e.columns)
 
     except Exception as e:
-        st.sidebar.error(f"❌ Error loading CSV: {e}")
+        progress.empty()
+        st.sidebar.error(f"❌ Error loading history: {e}")
 
-# Opción 1: archivo subido
+# Opción 1: archivo subido (solo se importa una vez por archivo, no en cada rerun)
 if uploaded_file:
-    content = uploaded_file.read().decode("utf-8-sig")
-    load_csv_data(content)
+    upload_id = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+    if st.session_state.get("imported_upload_id") != upload_id:
+        st.session_state["imported_upload_id"] = upload_id
+        uploaded_file.seek(0)
+        if uploaded_file.name.lower().endswith(".parquet"):
+            load_parquet_data(uploaded_file)
+        else:
+            text_stream = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig", newline="")
+            load_csv_data(text_stream, total_bytes=uploaded_file.size, position=uploaded_file.tell)
+            text_stream.detach()
 
 # Opción 2: texto pegado manualmente
 elif manual_csv.strip():
-    load_csv_data(manual_csv.strip())
+    load_csv_data(io.StringIO(manual_csv.strip()))
 
 # Ayuda visual
 with st.sidebar.expander("📘 CSV Format Help"):
@@ -103,186 +165,21 @@ with st.sidebar.expander("📘 CSV Format Help"):
 # Borrar historial y archivos JSON asociados
 if st.sidebar.button("🗑️ Clear History"):
     st.session_state["log"] = []
+    st.session_state["history_html_cache"] = {}
+    pull_stats.reset()
     tracker.clear_all()
 
 # Mostrar puntos actuales
 st.sidebar.markdown(f"⭐ Transcendent Points: `{tracker.get_points()}`")
 
-# ------------------ READ FUNCTION ------------------
-
-def read_file_with_weight(filename, avg, min_val, max_val):
-    elements, weights, rarities, descriptions = [], [], [], []
-
-    min_rarity = float(min_val)
-    avg_rarity = float(avg)
-    max_rarity = float(max_val)
-    sigma = 1.2
-    skew_strength = 0.6  # Controla cuánto se aplana del lado derecho
-
-    def custom_weight(rarity):
-        x = (rarity - avg_rarity) / sigma
-        skew = 1.0 + skew_strength if rarity > avg_rarity else 1.0 - skew_strength
-        return math.exp(-x * x * skew)
-
-    if filename == "Random":
-        filename = random.choice(["Ability", "Item", "Familiar", "Trait", "Skill"])
-
-    chosentype = filename.capitalize()
-    path = os.path.join("gachafiles", f"{filename}.txt")
-
-    with open(path, "r", encoding="utf-8") as file:
-        temp_description = []
-
-        for line in file:
-            match = re.match(r"^(\d+)\.(\S*)\s*(.*)", line)
-            if match:
-                parts = line.strip().split(",")
-                if len(parts) >= 2:
-                    element = parts[0].strip()
-                    try:
-                        rarity = float(parts[1])
-                    except ValueError:
-                        continue
-
-                    elements.append(element)
-                    rarities.append(rarity)
-                    weight = custom_weight(rarity)
-                    weights.append(weight)
-
-                    if temp_description:
-                        descriptions.append(" ".join(temp_description).strip())
-                        temp_description = []
-            else:
-                temp_description.append(line)
-
-        if temp_description:
-            descriptions.append(" ".join(temp_description).strip())
-
-    weightsum = sum(weights)
-
-    return elements, weights, rarities, descriptions, weightsum, chosentype
 # ------------------ GACHA FUNCTIONS ------------------
+# La lógica de tiradas vive en logic.GachaEngine; la app solo guarda un motor por sesión
+if "engine" not in st.session_state:
+    st.session_state["engine"] = GachaEngine(tracker=tracker)
+engine = st.session_state["engine"]
 
-def randomizer(min_val, max_val, avg, std_dev=0.8, bonus_chance=0.0048, bonus_max=2.0, max_penalty=0.7, max_attempts=10):
-    min_val = float(min_val)
-    max_val = float(max_val)
-    avg = float(avg)
-
-    for attempt in range(1, max_attempts + 1):
-        # Penalización progresiva al promedio para permitir encontrar algo cercano
-        penalty_factor = 1 - min(max_penalty, (attempt - 1) * 0.07)  # Límite: -70%
-        capped_avg = avg * penalty_factor
-        rarity = random.gauss(capped_avg, std_dev)
-
-        # Bonus de rareza ocasional
-        if random.random() < bonus_chance:
-            rarity += random.uniform(0.1, bonus_max)
-
-        # Clampeamos dentro de los límites
-        rarity = max(min_val, min(rarity, max_val))
-
-        if min_val <= rarity <= max_val:
-            return round(rarity, 2)
-    # Si falla todo, retorna el peor resultado
-    return round(min_val, 2)
-    
-def perform_gacha_draw(mode, min_val, avg, max_val, num_pulls=1, boost_transcendent=False, max_tries=10):
-    results = []
-    elements, base_weights, rarities, descriptions, _, chosentype = read_file_with_weight(mode, avg, min_val, max_val)
-
-    for _ in range(num_pulls):
-        for attempt in range(1, max_tries + 1):
-            raritypull = randomizer(min_val, max_val, avg, std_dev=0.8)
-
-            filtered = [(e, w, r, d) for e, w, r, d in zip(elements, base_weights, rarities, descriptions)
-                        if abs(r - raritypull) <= 0.25]
-
-            if filtered:
-                adjusted_weights = [w for _, w, _, _ in filtered]
-                filtered_weights_sum = sum(adjusted_weights)
-                if filtered_weights_sum == 0:
-                    break
-
-                selected = random.choices(filtered, weights=adjusted_weights)[0]
-                element, _, rarity, desc = selected
-                bonus_triggered = False
-
-                base_star_chance = 0.0048
-                tp = tracker.get_points()
-                boost_star_chance = 0.0
-
-                if boost_transcendent and tp >= 5:
-                    boost_star_chance = min(0.0023 * tp, 0.50)
-
-                total_star_chance = base_star_chance + boost_star_chance
-
-                # Nuevo bonus estrella con reevaluación y microajuste aleatorio
-                if random.random() < total_star_chance and rarity + 2 <= 10:
-                    enhanced_rarity = min(10.0, rarity + 2)
-
-                    upgraded = [(e, w, r, d) for e, w, r, d in zip(elements, base_weights, rarities, descriptions)
-                                if abs(r - enhanced_rarity) <= 0.25]
-
-                    if upgraded:
-                        selected = random.choices(upgraded, weights=[w for _, w, _, _ in upgraded])[0]
-                        element, _, rarity, desc = selected
-                        rarity = round(rarity + random.uniform(0.05, 0.40), 2)  # microajuste aleatorio
-
-                    element = f"★ {element}"
-                    bonus_triggered = True
-
-                rarity_range = max_val - min_val
-                if rarity_range == 0:
-                    estimated_luck = 100.0
-                else:
-                    distance_from_min = rarity - min_val
-                    estimated_luck = max(0.1, min(100.0, 100.0 * (1 - (distance_from_min / rarity_range))))
-
-                tier, color = get_tier_and_color(rarity)
-                pull_data = {
-                    "Type": chosentype,
-                    "Element": element,
-                    "Rarity": f"{round(rarity, 2):.2f}",
-                    "Tier": tier,
-                    "LuckValue": round(estimated_luck, 2),  # Valor numérico puro
-                    "Luck": f"{round(estimated_luck, 2):.2f}%",  # Valor con formato
-                    "Description": desc.replace("#", "").strip(),
-                    "Color": color,
-                    "Notes": ""
-                }
-                notes = []
-                if tracker.check_repeat(pull_data):
-                    notes.append("🔁 Repeated — +1 TP")
-
-                if bonus_triggered and boost_star_chance > 0:
-                    notes.append(f"✨ Boosted Star Bonus — -{tp} TP")
-                    tracker.spend_points(tp)
-
-                if notes:
-                    pull_data["Notes"] = " | ".join(notes)
-
-                results.append(pull_data)
-                break
-
-    return results
-
-def get_tier_and_color(rarity):
-    tiers = [
-        (1.0, 'Trash', '#a39589'),
-        (2.0, 'Common', '#9c7e5a'),
-        (3.0, 'Uncommon', '#aed1d1'),
-        (4.0, 'Rare', '#11d939'),
-        (5.0, 'Elite', '#1172d9'),
-        (6.0, 'Epic', '#6811d9'),
-        (7.0, 'Legendary', '#f7d40a'),
-        (8.0, 'Mythical', '#fc61ff'),
-        (9.0, 'Divine', '#ff8c00'),
-        (10.0, 'Transcendent', '#ff0000'),
-    ]
-    for limit, name, color in tiers:
-        if rarity < limit:
-            return name, color
-    return "Transcendent", "#ff0000"
+def perform_gacha_draw(mode, min_val, avg, max_val, num_pulls=1, boost_transcendent=False):
+    return engine.draw(DrawConfig(mode, min_val, avg, max_val, boost_transcendent), num_pulls)
 
 # ------------------ STREAMLIT INTERFACE ------------------
 st.title("🎲 Chaos Gacha Web")
@@ -320,16 +217,7 @@ with st.expander("ℹ️ What do 'Rarity' and 'Estimated Luck' mean?"):
     This value is calculated based on the rarity and the configured search range.
     """)
 
-presets = {
-    "Bronze": ((0.1, 1.3, 3.3), "#cd7f32"),
-    "Silver": ((0.5, 2.3, 4.3), "#c0c0c0"),
-    "Gold": ((1.5, 3.3, 5.3), "#ffd700"),
-    "Platinum": ((2.5, 4.3, 6.3), "#e5e4e2"),
-    "Diamond": ((3.5, 5.3, 7.3), "#b9f2ff"),
-    "Legendary": ((4.5, 6.3, 8.3), "#f7d40a"),
-    "Mythical": ((5.5, 7.3, 9.3), "#fc61ff"),
-    "Divine": ((6.5, 8.3, 10.0), "#ff8c00"),
-}
+presets = PRESETS
 
 if "min_val" not in st.session_state:
     st.session_state["min_val"] = 0.1
@@ -372,44 +260,29 @@ st.session_state["max_val"] = max_val
 
 # Selector + Botón de Multi Pull
 # Selector de multipull
-pull_count = st.selectbox("Select number of pulls:", [1, 2, 5, 10], index=0)
-
-def classify_luck(luck_value):
-    if luck_value > 95:
-        return "Below Average"
-    elif luck_value > 75:
-        return "Average"
-    elif luck_value > 55:
-        return "Above Average"
-    elif luck_value > 35:
-        return "Notable"
-    elif luck_value > 15:
-        return "Rare"
-    elif luck_value > 5:
-        return "Exceptional Pull"
-    else:
-        return "Mythic Pull"
+pull_count = st.selectbox("Select number of pulls:", [1, 2, 5, 10, 100, 1000], index=0)
 
 # Función para mostrar un resultado
 def display_result(result, min_val, max_val):
-    tier, color = get_tier_and_color(float(result["Rarity"]))
-    if "LuckValue" in result:
-        luck_value = float(result["LuckValue"])
-    else:
-        luck_value = float(result["Luck"].replace('%', ''))
-    luck_type = classify_luck(luck_value)
+    with instrument.timer("ui.display_result"):
+        render_result(result, min_val, max_val)
 
-    notes = result.get("Notes", "")
-    is_boosted_star = "Boosted Star Bonus" in notes
+def render_result(result, min_val, max_val):
+    tier, color = get_tier_and_color(result.rarity)
+    luck_type = classify_luck(result.luck)
+
+    notes = result.notes
+    description = result.description
+    is_boosted_star = result.boosted
 
     star_icon = "🎉🎉" if is_boosted_star else ""
     boost_msg = f"<span style='color:#ffcc00;font-weight:bold;'>✨ Boosted Star Bonus Activated!</span><br>" if is_boosted_star else ""
     border_style = "3px solid #ffcc00" if is_boosted_star else "1px solid #444"
 
-    st.markdown(f"<h3 style='color:{color}' title='{result['Description']}'>{star_icon} 🎉 {result['Element']}</h3>", unsafe_allow_html=True)
-    st.markdown(f"<span style='color:{color}'><strong>Rarity</strong>: `{float(result['Rarity']):.2f}` ({tier})</span>", unsafe_allow_html=True)
-    st.markdown(f"<span style='color:{color}'><strong>Type</strong>: `{result['Type']}`</span>", unsafe_allow_html=True)
-    st.markdown(f"<span style='color:{color}'><strong>Estimated Luck</strong>: `{result['Luck']}` – {luck_type}</span>", unsafe_allow_html=True)
+    st.markdown(f"<h3 style='color:{color}' title='{description}'>{star_icon} 🎉 {result.element}</h3>", unsafe_allow_html=True)
+    st.markdown(f"<span style='color:{color}'><strong>Rarity</strong>: `{result.rarity:.2f}` ({tier})</span>", unsafe_allow_html=True)
+    st.markdown(f"<span style='color:{color}'><strong>Type</strong>: `{result.type}`</span>", unsafe_allow_html=True)
+    st.markdown(f"<span style='color:{color}'><strong>Estimated Luck</strong>: `{result.luck:.2f}%` – {luck_type}</span>", unsafe_allow_html=True)
 
     if notes:
         st.markdown(f"<span style='color:#cccccc;'><strong>Notes:</strong> {notes}</span>", unsafe_allow_html=True)
@@ -418,24 +291,13 @@ def display_result(result, min_val, max_val):
     st.markdown(
         f"<div style='background-color:#111;padding:10px;border-radius:10px;border:{border_style};'>"
         f"{boost_msg}"
-        f"<p style='color:white;font-size:16px;line-height:1.5;text-align:justify;'>{result['Description']}</p>"
+        f"<p style='color:white;font-size:16px;line-height:1.5;text-align:justify;'>{description}</p>"
         f"</div>",
         unsafe_allow_html=True
     )
 
-    log_entry = {
-        "Type": result["Type"],
-        "Element": result["Element"],
-        "Rarity": result["Rarity"],
-        "Tier": result["Tier"],
-        "Luck": result["Luck"],
-        "Description": result["Description"],
-        "Color": result["Color"],
-        "Notes": notes
-    }
-
 # Botón individual 🎰 Roll
-# Al hacer una tirada, desactiva la variable csv_data para evitar pre-render CSV
+# Al hacer una tirada, desactiva la variable export_data para evitar pre-render de la exportación
 
 # Inicializar control anti-spam si no existe
 if "last_click_time" not in st.session_state:
@@ -449,7 +311,7 @@ if st.button("🎰 Roll", type="primary"):
     now = time.time()
     if now - st.session_state["last_click_time"] >= CLICK_DELAY:
         st.session_state["last_click_time"] = now
-        st.session_state["csv_data"] = None  # 🚫 Evitar generación automática
+        st.session_state["export_data"] = None  # 🚫 Evitar generación automática
         results = perform_gacha_draw(mode, min_val, avg, max_val, num_pulls=1, boost_transcendent=True)
         new_entries = []
         result_container = st.container()
@@ -458,8 +320,9 @@ if st.button("🎰 Roll", type="primary"):
                 if result:
                     display_result(result, min_val, max_val)
                     new_entries.append(result)
+        # El tracker ya se actualizó tirada a tirada dentro de perform_gacha_draw
         st.session_state["log"].extend(new_entries)
-        tracker.load_from_log(st.session_state["log"])
+        pull_stats.add_many(new_entries)
         st.session_state["show_curve_analysis"] = False
     else:
         st.warning("⏳ Please wait a moment before clicking again.")
@@ -469,22 +332,65 @@ if st.button("🎲 Multi-Roll"):
     now = time.time()
     if now - st.session_state["last_click_time"] >= CLICK_DELAY:
         st.session_state["last_click_time"] = now
-        st.session_state["csv_data"] = None  # 🚫 Evitar generación automática
+        st.session_state["export_data"] = None  # 🚫 Evitar generación automática
         results = perform_gacha_draw(mode, min_val, avg, max_val, num_pulls=pull_count, boost_transcendent=True)
         new_entries = []
         result_container = st.container()
         with result_container:
-            for result in results:
-                if result:
-                    display_result(result, min_val, max_val)
-                    new_entries.append(result)
+            if len(results) > 10:
+                # Para tiradas masivas se muestra una tabla en vez de una tarjeta por resultado
+                new_entries = [result for result in results if result]
+                st.dataframe(
+                    records_to_columns(new_entries, ["Type", "Element", "Rarity", "Tier", "Luck", "Notes"]),
+                    use_container_width=True
+                )
+            else:
+                for result in results:
+                    if result:
+                        display_result(result, min_val, max_val)
+                        new_entries.append(result)
+        # El tracker ya se actualizó tirada a tirada dentro de perform_gacha_draw
         st.session_state["log"].extend(new_entries)
-        tracker.load_from_log(st.session_state["log"])
+        pull_stats.add_many(new_entries)
         st.session_state["show_curve_analysis"] = False
     else:
         st.warning("⏳ Please wait a moment before clicking again.")
 
 
+def history_entry_html(index, entry):
+    # Fragmentos HTML cacheados por entrada: una tirada ya registrada no cambia
+    cache = st.session_state.setdefault("history_html_cache", {})
+    key = (index, id(entry))
+    fragment = cache.get(key)
+    if fragment is None:
+        color = entry.color
+        fragment = f"""
+            <div style='
+                background-color:#222;
+                padding:15px;
+                margin:10px 0;
+                border-radius:10px;
+                box-shadow:0 0 5px rgba(255,255,255,0.1);
+            '>
+                <h4 style='color:{color};margin-bottom:5px;'>#{index + 1} — {entry.element}</h4>
+                <p style='margin:2px 0;color:{color};'><strong>Type:</strong> {entry.type}</p>
+                <p style='margin:2px 0;color:{color};'><strong>Rarity:</strong> {entry.rarity:.2f} ({entry.tier})</p>
+                <p style='margin:2px 0;color:{color};'><strong>Luck:</strong> {entry.luck:.2f}%</p>
+                <p style='margin:10px 0 0 0;'><strong>Description:</strong></p>
+                <div style='
+                    background-color:#111;
+                    padding:10px;
+                    border-radius:8px;
+                    color:#ddd;
+                    font-size:14px;
+                    white-space:pre-wrap;
+                    word-wrap:break-word;
+                '>{entry.description or "No description"}</div>
+            </div>
+            """
+        cache[key] = fragment
+    return fragment
+
 # Mostrar historial y permitir descarga solo después de al menos una tirada
 if st.session_state.get("log"):
     if "show_history" not in st.session_state:
@@ -499,6 +405,30 @@ if st.session_state.get("log"):
         st.markdown("## 📜 Roll History")
         st.markdown(f"Total Rolls: **{len(st.session_state['log'])}**")
 
+        log = st.session_state["log"]
+
+        # Filtros y paginación del lado del servidor: solo se renderiza la página visible
+        col_type, col_tier, col_size = st.columns([2, 2, 1])
+        with col_type:
+            type_filter = st.multiselect("Filter by type", ["Ability", "Item", "Familiar", "Skill", "Trait"],
+                                         key="history_type_filter")
+        with col_tier:
+            tier_filter = st.multiselect("Filter by tier", [name for _, name, _ in TIERS], key="history_tier_filter")
+        with col_size:
+            page_size = st.selectbox("Per page", [10, 25, 50, 100], index=1, key="history_page_size")
+
+        # Más recientes primero, como antes
+        visible = [
+            i for i in range(len(log) - 1, -1, -1)
+            if (not type_filter or log[i].type in type_filter)
+            and (not tier_filter or log[i].tier in tier_filter)
+        ]
+        total_pages = max(1, math.ceil(len(visible) / page_size))
+        page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1, key="history_page")
+        page = min(int(page), total_pages)
+        page_indices = visible[(page - 1) * page_size: page * page_size]
+        st.caption(f"Showing {len(page_indices)} of {len(visible)} matching rolls — page {page}/{total_pages}")
+
         log_html = """
         <div style='
             max-height: 500px;
@@ -510,57 +440,43 @@ if st.session_state.get("log"):
             padding: 10px;
             background-color: #1e1e1e;
         '>
-        """
-        for i, entry in enumerate(reversed(st.session_state["log"]), 1):
-            color = entry.get("Color", "#f0f0f0")
-            log_html += f"""
-            <div style='
-                background-color:#222;
-                padding:15px;
-                margin:10px 0;
-                border-radius:10px;
-                box-shadow:0 0 5px rgba(255,255,255,0.1);
-            '>
-                <h4 style='color:{color};margin-bottom:5px;'>#{len(st.session_state["log"]) - i + 1} — {entry.get("Element", "Unknown")}</h4>
-                <p style='margin:2px 0;color:{color};'><strong>Type:</strong> {entry.get("Type", "-")}</p>
-                <p style='margin:2px 0;color:{color};'><strong>Rarity:</strong> {entry.get("Rarity", "-")} ({entry.get("Tier", "-")})</p>
-                <p style='margin:2px 0;color:{color};'><strong>Luck:</strong> {entry.get("Luck", "-")}</p>
-                <p style='margin:10px 0 0 0;'><strong>Description:</strong></p>
-                <div style='
-                    background-color:#111;
-                    padding:10px;
-                    border-radius:8px;
-                    color:#ddd;
-                    font-size:14px;
-                    white-space:pre-wrap;
-                    word-wrap:break-word;
-                '>{entry.get("Description", "No description")}</div>
-            </div>
-            """
-        log_html += "</div>"
+        """ + "".join(history_entry_html(i, log[i]) for i in page_indices) + "</div>"
+
+        from streamlit.components.v1 import html
 
-        html(log_html, height=550)
+        with instrument.timer("ui.history_render"):
+            html(log_html, height=550)
 
         st.session_state["rendering_log"] = False
 
-        df_log = pd.DataFrame(st.session_state["log"])
-        if "Luck" in df_log.columns:
-            df_log["Luck"] = df_log["Luck"].astype(str)
-        columns_order = ["Type", "Element", "Rarity", "Tier", "LuckValue", "Luck", "Description", "Color", "Notes"]
-        df_log = df_log[[col for col in columns_order if col in df_log.columns]]
+        export_format = st.radio("Export format", ["CSV", "Parquet"], horizontal=True, key="export_format")
 
-        if st.button("⬇️ Generate CSV File"):
-            csv_buffer = io.StringIO()
-            df_log.to_csv(csv_buffer, index=False, encoding="utf-8-sig")
-            csv_data = csv_buffer.getvalue()
-            st.session_state["csv_data"] = csv_data
+        if st.button(f"⬇️ Generate {export_format} File"):
+            from logic.history_io import write_history_csv, write_history_parquet
 
-        if st.session_state.get("csv_data"):
+            # Se escribe por lotes en un buffer binario; en sesión solo queda una copia en bytes
+            export_buffer = io.BytesIO()
+            try:
+                if export_format == "Parquet":
+                    write_history_parquet(st.session_state["log"], export_buffer)
+                else:
+                    write_history_csv(st.session_state["log"], export_buffer)
+                st.session_state["export_data"] = (export_format, export_buffer.getvalue())
+            except ImportError as e:
+                st.error(f"❌ {e}")
+            export_buffer.close()
+
+        if st.session_state.get("export_data"):
+            data_format, data = st.session_state["export_data"]
+            if data_format == "Parquet":
+                file_name, mime = "gacha_history.parquet", "application/vnd.apache.parquet"
+            else:
+                file_name, mime = "gacha_history.csv", "text/csv"
             st.download_button(
-                label="📥 Download History as CSV",
-                data=st.session_state["csv_data"],
-                file_name="gacha_history.csv",
-                mime="text/csv"
+                label=f"📥 Download History as {data_format}",
+                data=data,
+                file_name=file_name,
+                mime=mime
             )
 
 
@@ -622,19 +538,20 @@ content = st.text_area(
 # Actualizar el contenido editado en session_state
 st.session_state["edited_files"][selected_gachafile] = st.session_state[edit_key]
 
+# Almacén de versiones (blobs por contenido + diferencias por líneas); listar solo lee el índice
+version_store = get_version_store()
+
 # Botón Guardar cambios manual
 if st.button("💾 Save Changes"):
     path = os.path.join("gachafiles", f"{selected_gachafile}.txt")
     try:
         with open(path, "w", encoding="utf-8") as f:
             f.write(st.session_state["edited_files"][selected_gachafile])
+        invalidate_catalog(selected_gachafile)
         st.success(f"✅ Changes saved to `{selected_gachafile}.txt`.")
 
-        # Guardar versión automática con timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        version_path = os.path.join("gachafiles_versions", f"{selected_gachafile}_{timestamp}.txt")
-        with open(version_path, "w", encoding="utf-8") as f:
-            f.write(st.session_state["edited_files"][selected_gachafile])
+        # Guardar versión automática con timestamp (si el contenido cambió desde la última)
+        version_store.save(selected_gachafile, st.session_state["edited_files"][selected_gachafile])
 
     except Exception as e:
         st.error(f"❌ Error saving file: {e}")
@@ -642,89 +559,68 @@ if st.button("💾 Save Changes"):
 st.markdown("---")
 st.subheader("Saved Versions")
 
-import base64
-
 st.markdown("## 📜 Saved Versions")
 
-version_folder = "gachafiles_versions"
-file_prefix = selected_gachafile + "_"
-
-# Buscar versiones guardadas del archivo actual
-version_files = sorted(
-    [f for f in os.listdir(version_folder) if f.startswith(file_prefix)],
-    reverse=True
-    
-)
+# Versiones guardadas del archivo actual (más recientes primero)
+version_entries = version_store.entries(selected_gachafile)
 
 if "editable_gachafiles" not in st.session_state:
     st.session_state.editable_gachafiles = {}
     
-if version_files:
-    for version_file in version_files:
-        version_path = os.path.join(version_folder, version_file)
+if version_entries:
+    for entry in version_entries:
         col1, col2, col3, col4 = st.columns([4, 1, 1, 1])
         
         with col1:
-            st.markdown(f"📂 `{version_file}`")
+            st.markdown(f"📂 `{entry.name}`")
 
         with col2:
-            if st.button("🔄 Restore", key=f"restore_{version_file}"):
-                with open(version_path, "r", encoding="utf-8") as f:
-                    st.session_state.editable_gachafiles[selected_gachafile] = f.read()
-                st.success(f"✅ Restored version: {version_file}")
+            if st.button("🔄 Restore", key=f"restore_{entry.key}"):
+                st.session_state.editable_gachafiles[selected_gachafile] = version_store.read(entry.hash)
+                st.success(f"✅ Restored version: {entry.name}")
 
         with col3:
-            if st.button("🗑️ Delete", key=f"delete_{version_file}"):
+            if st.button("🗑️ Delete", key=f"delete_{entry.key}"):
                 try:
-                    os.remove(version_path)
-                    st.success(f"🗑️ Deleted version: {version_file}")
+                    version_store.delete([entry])
+                    st.success(f"🗑️ Deleted version: {entry.name}")
                 except Exception as e:
                     st.error(f"❌ Error deleting version: {e}")
 
         with col4:
-            with open(version_path, "rb") as f:
-                file_content = f.read()
-                b64 = base64.b64encode(file_content).decode()
-                href = f'<a href="data:file/txt;base64,{b64}" download="{version_file}">⬇️ Download</a>'
-                st.markdown(href, unsafe_allow_html=True)
+            # El contenido se reconstruye solo al pedir la descarga, no en cada rerun
+            if st.button("⬇️ Download", key=f"download_{entry.key}"):
+                st.session_state["version_download"] = (entry.key, version_store.read(entry.hash))
+            prepared = st.session_state.get("version_download")
+            if prepared and prepared[0] == entry.key:
+                st.download_button("💾 Save", prepared[1], file_name=entry.name, mime="text/plain",
+                                   key=f"save_{entry.key}")
 else:
     st.info("No saved versions available for this file.")
 
     st.markdown("## 🗑️ Manage Saved Versions")
 
-version_folder = "gachafiles_versions"
-
-if not os.path.exists(version_folder):
-    os.makedirs(version_folder)
-
 # -------------------------------
 # Borrar versiones del archivo actual
 # -------------------------------
-file_prefix = selected_gachafile + "_"
-version_files = [
-    f for f in os.listdir(version_folder)
-    if f.startswith(file_prefix) and f.endswith(".txt")
-]
-
 st.markdown("### 🔍 Delete Versions for Current File")
 
-if version_files:
+if version_entries:
     selected_versions = st.multiselect(
         "Select versions to delete:",
-        version_files,
+        version_entries,
+        format_func=lambda entry: entry.name,
         help="These are saved historical versions of the current file."
        
     )
     if st.button("❌ Delete Selected Versions"):
-        deleted = []
-        for vf in selected_versions:
-            try:
-                os.remove(os.path.join(version_folder, vf))
-                deleted.append(vf)
-            except Exception as e:
-                st.error(f"Failed to delete {vf}: {e}")
+        try:
+            deleted = version_store.delete(selected_versions)
+        except Exception as e:
+            deleted = 0
+            st.error(f"Failed to delete versions: {e}")
         if deleted:
-            st.success(f"Deleted: {', '.join(deleted)}")
+            st.success(f"Deleted: {', '.join(entry.name for entry in selected_versions)}")
         else:
             st.warning("No versions were deleted.")
 else:
@@ -736,16 +632,10 @@ else:
 st.markdown("---")
 st.markdown("### 🧨 Delete All Versions (All Files)")
 
-all_versions = [
-    f for f in os.listdir(version_folder)
-    if f.endswith(".txt")
-]
-
-if all_versions:
+if version_store.entries():
     if st.button("💣 Delete ALL Saved Versions (Irreversible)"):
         try:
-            for f in all_versions:
-                os.remove(os.path.join(version_folder, f))
+            version_store.delete_all()
             st.success("✅ All saved versions deleted.")
         except Exception as e:
             st.error(f"❌ Error deleting versions: {e}")
@@ -787,12 +677,31 @@ elif manual_text.strip():
 
 if version_content and base_name:
     if st.button(f"📥 Load to 'Saved Versions' as new version of '{base_name}'", key="load_uploaded_to_versions"):
-        st.session_state.setdefault("gachafiles_versions", {}).setdefault(base_name, []).append(version_content)
+        version_store.save(base_name, version_content)
         st.session_state.setdefault("edited_files", {})[base_name] = version_content
         if base_name not in st.session_state.get("original_files", {}):
             st.session_state.setdefault("original_files", {})[base_name] = version_content
         st.success(f"✅ Version added to saved history under '{base_name}' and updated as editable.")
 
+st.markdown("---")
+st.subheader("📈 Pull Statistics")
+
+if pull_stats.total == 0:
+    st.info("No pulls have been made yet.")
+else:
+    stat_cols = st.columns(5)
+    stat_cols[0].metric("Total Pulls", f"{pull_stats.total:,}")
+    stat_cols[1].metric("Avg Rarity", f"{pull_stats.rarity.mean:.2f}", help=f"Std: {pull_stats.rarity.std:.2f}")
+    stat_cols[2].metric("Avg Luck", f"{pull_stats.luck.mean:.2f}%", help=f"Std: {pull_stats.luck.std:.2f}")
+    stat_cols[3].metric("Star / Repeat Rate", f"{100 * pull_stats.star_rate:.2f}% / {100 * pull_stats.repeat_rate:.2f}%")
+    stat_cols[4].metric("TP Earned / Spent", f"{pull_stats.tp_earned} / {pull_stats.tp_spent}")
+
+    with st.expander("Tier counts by category"):
+        tier_table = pull_stats.tier_table()
+        st.dataframe({"Tier": list(tier_table), **{
+            category: [row[category] for row in tier_table.values()] for category in sorted(pull_stats.by_category)
+        }}, use_container_width=True, hide_index=True)
+
 st.markdown("---")
 st.subheader("📊 Bell Curve Analysis")
 
@@ -818,37 +727,24 @@ if st.session_state["show_curve_analysis"]:
     with col3:
         show_histogram = st.checkbox("Show Actual Pulls", value=True)
 
-    sample_types = ["Ability", "Item", "Familiar", "Skill", "Trait"]
-    sigma = 1.2
-    skew_strength = 0.6
-    bonus_chance = 0.0048
-    bonus_max = 2.0
+    import altair as alt
+    import pandas as pd
+    from logic.curves import bell_curves
 
-    def skewed_gauss(x, avg):
-        skew = 1.0 + skew_strength if x > avg else 1.0 - skew_strength
-        return np.exp(-((x - avg) ** 2) / (2 * sigma ** 2) * skew)
-
-    df_log = pd.DataFrame(st.session_state.get("log", [])) if show_histogram else pd.DataFrame()
+    sample_types = ["Ability", "Item", "Familiar", "Skill", "Trait"]
 
-    if show_histogram and df_log.empty:
+    # Los histogramas por tipo (bins fijos) ya están en las estadísticas acumuladas
+    if show_histogram and pull_stats.total == 0:
         st.info("No pulls have been made yet. Pull some results to enable histogram.")
     else:
-        if show_histogram:
-            if "Rarity" not in df_log.columns:
-                st.warning("Rarity data is missing or log not initialized.")
-                df_log = pd.DataFrame()
-            else:
-                df_log["Rarity"] = pd.to_numeric(df_log["Rarity"], errors="coerce")
-                df_log = df_log.dropna(subset=["Rarity"])
+        # Las curvas son iguales para todas las categorías y quedan memorizadas por (min, avg, max)
+        x_vals, skewed_vals, bonus_vals = bell_curves(min_val, avg, max_val)
+        df_base = pd.DataFrame({"Rarity": x_vals, "Skewed": skewed_vals, "Bonus": bonus_vals})
 
         for pull_type in sample_types:
-            x_vals = np.linspace(min_val, max_val, 500)
-            df_base = pd.DataFrame({"Rarity": x_vals})
-
             charts = []
 
             if show_normal:
-                df_base["Skewed"] = [skewed_gauss(x, avg) for x in x_vals]
                 line_skewed = alt.Chart(df_base).mark_line(color="skyblue").encode(
                     x="Rarity",
                     y=alt.Y("Skewed", title="Weight (Normal)"),
@@ -857,12 +753,6 @@ if st.session_state["show_curve_analysis"]:
                 charts.append(line_skewed)
 
             if show_bonus:
-                base_curve = np.array([skewed_gauss(x, avg) for x in x_vals])
-                bonus_peak = np.array([
-                    bonus_chance * np.exp(-((x - (avg + bonus_max / 2)) ** 2) / (2 * sigma ** 2))
-                    for x in x_vals
-                ])
-                df_base["Bonus"] = base_curve + bonus_peak
                 line_bonus = alt.Chart(df_base).mark_line(color="orange").encode(
                     x="Rarity",
                     y=alt.Y("Bonus", title="Weight (Bonus)"),
@@ -870,16 +760,56 @@ if st.session_state["show_curve_analysis"]:
                 )
                 charts.append(line_bonus)
 
-            if show_histogram and not df_log.empty:
-                pulls_type = df_log[df_log["Type"].str.lower() == pull_type.lower()]
-                if not pulls_type.empty:
-                    hist = alt.Chart(pulls_type).mark_bar(opacity=0.5, color="white").encode(
-                        x=alt.X("Rarity", bin=alt.Bin(maxbins=25), title="Rarity"),
-                        y=alt.Y("count()", title="Pull Count"),
-                        tooltip=["count()"]
+            if show_histogram:
+                bin_start, bin_end, counts = pull_stats.histogram_bins(pull_type)
+                if len(counts):
+                    df_hist = pd.DataFrame({"Rarity": bin_start, "RarityEnd": bin_end, "Pull Count": counts})
+                    hist = alt.Chart(df_hist).mark_bar(opacity=0.5, color="white").encode(
+                        x=alt.X("Rarity", bin="binned", title="Rarity"),
+                        x2="RarityEnd",
+                        y=alt.Y("Pull Count", title="Pull Count"),
+                        tooltip=["Pull Count"]
                     )
                     charts.append(hist)
 
             if charts:
                 chart = alt.layer(*charts).resolve_scale(y='independent').interactive()
                 st.altair_chart(chart, use_container_width=True)
+
+# ------------------ DEBUG PANEL ------------------
+st.sidebar.markdown("---")
+st.sidebar.checkbox("🛠️ Debug metrics", value=st.query_params.get("debug") == "1", key="debug_metrics")
+
+if metrics is not None:
+    st.sidebar.checkbox("cProfile each rerun", key="debug_cprofile")
+    st.sidebar.checkbox("tracemalloc each rerun", key="debug_tracemalloc")
+
+    metrics.add_time("app.rerun", time.perf_counter() - rerun_start)
+    instrument.deactivate()
+    profile_report = {}
+    if run_profiler is not None:
+        profile_report = run_profiler.stop()
+        st.session_state.pop("debug_profiler", None)
+
+    snapshot = metrics.snapshot()
+    instrument.log_metrics(metrics, user=tracker.profile, pulls=pull_stats.total)
+
+    with st.sidebar.expander("🛠️ Rerun Metrics", expanded=True):
+        import pandas as pd
+
+        st.dataframe(pd.DataFrame.from_dict(snapshot["timers"], orient="index").round(3), use_container_width=True)
+        if snapshot["counters"]:
+            st.dataframe(pd.DataFrame.from_dict(snapshot["counters"], orient="index", columns=["value"]),
+                         use_container_width=True)
+        st.download_button(
+            label="📥 Download metrics JSON",
+            data=json.dumps({**snapshot, **profile_report}, indent=2, ensure_ascii=False),
+            file_name="gacha_metrics.json",
+            mime="application/json"
+        )
+        if "cprofile" in profile_report:
+            st.code(profile_report["cprofile"])
+        if "tracemalloc" in profile_report:
+            memory = profile_report["tracemalloc"]
+            st.markdown(f"Memory: current `{memory['current_kb']:.0f} KB`, peak `{memory['peak_kb']:.0f} KB`")
+            st.code("\n".join(memory["top"]))
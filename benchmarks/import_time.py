@@ -0,0 +1,97 @@
+# Presupuesto de tiempo de importación para el arranque en frío de la app.
+# Cada medida se hace en un intérprete nuevo (como un contenedor recién levantado).
+#   python -m benchmarks.import_time --budget-ms 80
+#   python -m benchmarks.import_time --with-streamlit --json import_time.json
+import argparse
+import json
+import statistics
+import os
+import subprocess
+import sys
+
+# Lo que Gacha_app.py importa al arrancar (mantener sincronizado con la cabecera del script)
+STARTUP_IMPORTS = [
+    "io", "os", "re", "math", "time", "json",
+    "logic.tracker", "logic.gacha_engine", "logic.catalog", "logic.records", "logic.stats", "logic.versions", "logic.utils",
+    "logic.instrument",
+]
+# Módulos pesados que solo deben cargarse en las secciones que los usan
+LAZY_MODULES = ["numpy", "pandas", "altair", "pyarrow"]
+DEFAULT_BUDGET_MS = 80.0
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def parse_importtime(stderr: str, top: int):
+    # Líneas de -X importtime: "import time: self [us] | cumulative | imported package"
+    rows = []
+    for line in stderr.splitlines():
+        parts = line[len("import time:"):].split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        self_us, cumulative_us, name = parts
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": cum / 1000, "self_ms": own / 1000} for cum, own, name in rows[:top]]
+
+
+def measure(modules, runs: int = 5, top: int = 15) -> dict:
+    code = _PROBE.format(modules=modules, lazy=LAZY_MODULES)
+    times, loaded, breakdown = [], set(), []
+    for i in range(runs):
+        args = [sys.executable, "-X", "importtime", "-c", code] if i == 0 else [sys.executable, "-c", code]
+        proc = subprocess.run(args, capture_output=True, text=True, check=True, cwd=ROOT)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        loaded.update(result["loaded"])
+        if i == 0:
+            breakdown = parse_importtime(proc.stderr, top)
+    return {
+        "modules": modules,
+        "runs": runs,
+        # La primera ejecución lleva -X importtime (más lenta): solo cuenta para el desglose
+        "median_ms": 1000 * statistics.median(times[1:] or times),
+        "min_ms": 1000 * min(times[1:] or times),
+        "heavy_modules_loaded": sorted(loaded),
+        "slowest": breakdown,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import time of the app's startup modules")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--with-streamlit", action="store_true", help="Include 'import streamlit' in the measurement")
+    parser.add_argument("--json", help="Write the results to this path")
+    args = parser.parse_args(argv)
+
+    modules = (["streamlit"] if args.with_streamlit else []) + STARTUP_IMPORTS
+    report = measure(modules, runs=args.runs)
+    report["budget_ms"] = args.budget_ms
+    over_budget = report["median_ms"] > args.budget_ms
+    # Con Streamlit no se comprueba la carga perezosa: el propio Streamlit puede importar pandas/numpy
+    eager = [] if args.with_streamlit else report["heavy_modules_loaded"]
+    report["ok"] = not over_budget and not eager
+
+    print(f"Startup imports: median {report['median_ms']:.1f} ms, min {report['min_ms']:.1f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+    for row in report["slowest"]:
+        print(f"  {row['module']:<40} {row['cumulative_ms']:8.2f} ms")
+    if eager:
+        print(f"Heavy modules imported at startup: {', '.join(eager)}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# Suite de benchmarks de los caminos críticos: parseo de catálogos, tiradas (una a una y por lotes),
+# coste del tracker según el tamaño del historial e importación de CSV.
+#   python -m benchmarks.suite --json bench.json
+#   python -m benchmarks.suite --quick --compare bench.json
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from logic.batch import draw_batch
+from logic.catalog import CATEGORIES, GACHAFILES_DIR, get_catalog, parse_gachafile
+from logic.gacha_engine import DrawConfig, GachaEngine
+from logic.history_io import open_history_csv, write_history_csv
+from logic.records import PullRecord, records_from_entries
+from logic.stats import PullStats
+from logic.storage import JsonJournalStore, SQLiteStore, repeat_key
+from logic.tracker import GachaHistoryTracker, entry_key, entry_tp_delta
+from logic.utils import PRESETS
+
+CATALOG_SIZES = [10_000, 100_000, 1_000_000]
+QUICK_CATALOG_SIZES = [10_000]
+PULL_COUNTS = [10, 1_000, 100_000]
+HISTORY_SIZES = [1_000, 10_000, 100_000]
+QUICK_HISTORY_SIZES = [1_000, 10_000]
+PRESET = "Gold"
+
+
+def measure(fn, repeat=5, number=1, warmup=1) -> dict:
+    # Tiempo por llamada: se guarda la mediana y el mínimo de varias repeticiones
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return {"median_s": statistics.median(times), "min_s": min(times), "repeat": repeat, "number": number}
+
+
+def write_synthetic_gachafile(path: str, size: int, seed: int):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1, size + 1):
+            f.write(f"{i}. Synthetic {i},{rng.randint(1, 99) / 10}\n")
+            f.write(f"#Synthetic element number {i} used for benchmarks.\n")
+
+
+def bench_parse(results, synthetic):
+    for category in CATEGORIES:
+        path = os.path.join(GACHAFILES_DIR, f"{category}.txt")
+        stats = measure(lambda: parse_gachafile(path, category), repeat=5)
+        results.append({"name": "parse", "params": {"catalog": category}, **stats})
+    for size, path in synthetic.items():
+        stats = measure(lambda: parse_gachafile(path, "Synthetic"), repeat=3 if size < 1_000_000 else 1)
+        results.append({"name": "parse", "params": {"catalog": f"synthetic-{size}"}, **stats})
+
+
+def bench_pulls(results, catalogs, pull_counts, seed):
+    (min_val, avg, max_val), _ = PRESETS[PRESET]
+    for name, (folder, category) in catalogs.items():
+        # Motor sin tracker: mide solo el muestreo (el coste del tracker va en bench_tracker)
+        engine = GachaEngine(seed=seed, folder=folder)
+        config = DrawConfig(category, min_val, avg, max_val)
+        catalog = engine.catalog(category)
+        np_rng = np.random.default_rng(seed)
+        params = {"catalog": name, "preset": PRESET}
+
+        stats = measure(lambda: engine.draw(config, 1), repeat=5, number=200)
+        results.append({"name": "single_pull", "params": params, **stats})
+
+        for n in pull_counts:
+            stats = measure(lambda: engine.draw(config, n), repeat=5)
+            results.append({"name": "engine_pulls", "params": {**params, "pulls": n}, **stats,
+                            "pulls_per_s": n / stats["median_s"]})
+            stats = measure(lambda: draw_batch(catalog, min_val, avg, max_val, n, rng=np_rng), repeat=5)
+            results.append({"name": "batch_pulls", "params": {**params, "pulls": n}, **stats,
+                            "pulls_per_s": n / stats["median_s"]})
+
+
+def make_store(backend: str, folder: str):
+    if backend == "sqlite":
+        return SQLiteStore(os.path.join(folder, "tracker.sqlite3"))
+    return JsonJournalStore(folder)
+
+
+def bench_tracker(results, history_sizes):
+    # Coste de una tirada de 10 (sync + comprobación de repetidos + flush) con N elementos ya guardados
+    for backend in ("json", "sqlite"):
+        for size in history_sizes:
+            with tempfile.TemporaryDirectory() as folder:
+                store = make_store(backend, folder)
+                store.replace_all((repeat_key("Bench", str(i)) for i in range(size)), 0)
+                tracker = GachaHistoryTracker(store)
+                counter = iter(range(10 ** 9))
+
+                def roll():
+                    tracker.sync()
+                    for _ in range(10):
+                        tracker.check_element("Bench", f"new-{next(counter)}")
+                    tracker.flush()
+
+                stats = measure(roll, repeat=5, number=20)
+                results.append({"name": "tracker_roll", "params": {"backend": backend, "history": size}, **stats})
+
+                stats = measure(lambda: make_store(backend, folder).close(), repeat=3)
+                results.append({"name": "tracker_open", "params": {"backend": backend, "history": size}, **stats})
+                store.close()
+
+
+def bench_csv_import(results, catalog, history_sizes, seed):
+    rng = np.random.default_rng(seed)
+    for size in history_sizes:
+        indices = rng.integers(0, len(catalog.elements), size)
+        records = [PullRecord(catalog, int(i), catalog.rarities[i], 50.0) for i in indices]
+        buffer = io.BytesIO()
+        write_history_csv(records, buffer)
+        data = buffer.getvalue()
+
+        def import_csv():
+            # Mismos pasos que Gacha_app.load_history_data: cabecera validada al abrir, registros y
+            # estadísticas por bloque, y un único replace_all del tracker al final
+            with tempfile.TemporaryDirectory() as folder:
+                tracker = GachaHistoryTracker(JsonJournalStore(folder))
+                log = []
+                stats = PullStats()
+                keys, points = set(), 0
+                for chunk in open_history_csv(io.StringIO(data.decode("utf-8-sig"))):
+                    entries = chunk.to_dict(orient="records")
+                    keys.update(entry_key(entry) for entry in entries)
+                    points += sum(entry_tp_delta(entry) for entry in entries)
+                    records = records_from_entries(entries)
+                    log.extend(records)
+                    stats.add_many(records)
+                tracker.replace_all(keys, points)
+                tracker.store.close()
+                return log
+
+        stats = measure(import_csv, repeat=3)
+        results.append({"name": "csv_import", "params": {"rows": size, "bytes": len(data)}, **stats,
+                        "rows_per_s": size / stats["median_s"]})
+
+
+def run(quick=False, seed=0) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        synthetic = {}
+        for size in QUICK_CATALOG_SIZES if quick else CATALOG_SIZES:
+            path = os.path.join(folder, f"synthetic_{size}.txt")
+            write_synthetic_gachafile(path, size, seed)
+            synthetic[size] = path
+
+        bench_parse(results, synthetic)
+
+        catalogs = {"Ability": (GACHAFILES_DIR, "Ability")}
+        catalogs.update({f"synthetic-{size}": (folder, f"synthetic_{size}") for size in synthetic})
+        bench_pulls(results, catalogs, PULL_COUNTS[:2] if quick else PULL_COUNTS, seed)
+
+    history_sizes = QUICK_HISTORY_SIZES if quick else HISTORY_SIZES
+    bench_tracker(results, history_sizes)
+    bench_csv_import(results, get_catalog("Ability"), history_sizes, seed)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": quick,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def result_key(result: dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()) if k != "bytes")
+    return f"{result['name']}[{params}]"
+
+
+def format_results(report: dict, baseline: dict = None) -> str:
+    previous = {result_key(r): r for r in baseline["results"]} if baseline else {}
+    lines = []
+    for result in report["results"]:
+        key = result_key(result)
+        line = f"{key:<62} {1000 * result['median_s']:>12.3f} ms"
+        if key in previous:
+            ratio = result["median_s"] / previous[key]["median_s"]
+            line += f"  x{ratio:.2f} vs baseline"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite for parsing, pulls, the tracker and CSV import")
+    parser.add_argument("--quick", action="store_true", help="Smaller catalogs and histories (no 100k/1M cases)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this path")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(quick=args.quick, seed=args.seed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(format_results(report, baseline))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Benchmark de contención: muchos hilos (una instancia de tracker cada uno, como las
+# sesiones de Streamlit) tirando a la vez contra el mismo almacenamiento compartido.
+#   python -m benchmarks.tracker_contention --threads 16 --rolls 50 --backend json
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+
+from logic.storage import JsonJournalStore, SQLiteStore
+from logic.tracker import GachaHistoryTracker
+
+
+def make_tracker(backend: str, folder: str) -> GachaHistoryTracker:
+    if backend == "sqlite":
+        return GachaHistoryTracker(SQLiteStore(f"{folder}/tracker.sqlite3"))
+    return GachaHistoryTracker(JsonJournalStore(folder))
+
+
+def worker(backend, folder, rolls, pulls_per_roll, elements, spend, seed, stats, barrier):
+    rng = random.Random(seed)
+    tracker = make_tracker(backend, folder)
+    barrier.wait()
+    latencies = []
+    repeats = spent = 0
+    pulled = set()
+    min_points = 0
+    for _ in range(rolls):
+        start = time.perf_counter()
+        tracker.sync()
+        for _ in range(pulls_per_roll):
+            pull = {"Type": "Bench", "Element": str(rng.randrange(elements))}
+            pulled.add(pull["Element"])
+            repeats += tracker.check_repeat(pull)
+        # Todas las sesiones intentan gastar el mismo saldo a la vez
+        cost = tracker.get_points() if spend else 0
+        spent_ok = cost > 0 and tracker.spend_points(cost)
+        report = tracker.flush()
+        repeats += len(report.late_repeats)
+        if spent_ok and not report.rejected_spends:
+            spent += cost
+        latencies.append(time.perf_counter() - start)
+        min_points = min(min_points, tracker.get_points())
+    tracker.store.close()
+    stats.append({"latencies": latencies, "repeats": repeats, "spent": spent, "pulled": pulled,
+                  "min_points": min_points})
+
+
+def run(backend="json", threads=8, rolls=50, pulls_per_roll=10, elements=2000, spend=True, seed=0) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        stats = []
+        barrier = threading.Barrier(threads)
+        workers = [
+            threading.Thread(target=worker,
+                             args=(backend, folder, rolls, pulls_per_roll, elements, spend, seed + i, stats, barrier))
+            for i in range(threads)
+        ]
+        start = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        # Comprobación de consistencia: ningún punto ni repetición debe perderse ni contarse dos veces,
+        # ningún TP debe gastarse dos veces y el saldo nunca puede quedar negativo
+        final = make_tracker(backend, folder)
+        total_pulls = threads * rolls * pulls_per_roll
+        expected_points = sum(s["repeats"] for s in stats) - sum(s["spent"] for s in stats)
+        distinct = set().union(*(s["pulled"] for s in stats))
+        stored = {key for key in final.store.repeats} if backend == "json" else {
+            "Bench::" + row[0] for row in final.store.conn.execute("SELECT element FROM repeats")}
+        latencies = sorted(lat for s in stats for lat in s["latencies"])
+        result = {
+            "backend": backend,
+            "threads": threads,
+            "pulls": total_pulls,
+            "seconds": elapsed,
+            "pulls_per_second": total_pulls / elapsed,
+            "roll_latency_p50_ms": 1000 * latencies[len(latencies) // 2],
+            "roll_latency_p99_ms": 1000 * latencies[int(len(latencies) * 0.99)],
+            "points": final.get_points(),
+            "expected_points": expected_points,
+            "min_points": min(s["min_points"] for s in stats),
+            "repeats": sum(s["repeats"] for s in stats),
+            "expected_repeats": total_pulls - len(distinct),
+            "stored_elements": len(stored),
+        }
+        result["consistent"] = (result["points"] == expected_points and result["points"] >= 0
+                                and result["min_points"] >= 0
+                                and result["repeats"] == result["expected_repeats"]
+                                and stored == {"Bench::" + element for element in distinct})
+        final.store.close()
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tracker contention benchmark")
+    parser.add_argument("--backend", choices=["json", "sqlite", "all"], default="all")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rolls", type=int, default=50)
+    parser.add_argument("--pulls-per-roll", type=int, default=10)
+    parser.add_argument("--elements", type=int, default=2000)
+    parser.add_argument("--no-spend", action="store_true", help="Only pull, never spend TP")
+    parser.add_argument("--json", help="Write the results to this path")
+    args = parser.parse_args(argv)
+
+    backends = ["json", "sqlite"] if args.backend == "all" else [args.backend]
+    results = [run(b, args.threads, args.rolls, args.pulls_per_roll, args.elements, not args.no_spend)
+               for b in backends]
+    for r in results:
+        print(f"{r['backend']:>6}: {r['pulls']:,} pulls in {r['seconds']:.2f}s "
+              f"({r['pulls_per_second']:,.0f}/s), roll p50 {r['roll_latency_p50_ms']:.1f} ms, "
+              f"p99 {r['roll_latency_p99_ms']:.1f} ms, consistent={r['consistent']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
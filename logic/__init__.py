@@ -1,5 +1,23 @@
 # logic/__init__.py
 
-# Exponer funciones clave del motor y el tracker
-from .gacha_engine import perform_gacha_draw
-from .tracker import GachaHistoryTracker
\ No newline at end of file
+# Exponer funciones clave del motor y el tracker.
+# Se importan al primer uso: "import logic.catalog" no arrastra el resto del paquete.
+_EXPORTS = {
+    "GachaEngine": ".gacha_engine",
+    "DrawConfig": ".gacha_engine",
+    "perform_gacha_draw": ".gacha_engine",
+    "GachaHistoryTracker": ".tracker",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
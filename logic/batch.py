@@ -0,0 +1,179 @@
+import threading
+import weakref
+from typing import Optional
+
+import numpy as np
+
+from . import instrument
+from .catalog import (BASE_STAR_CHANCE, BONUS_CHANCE, BONUS_MAX, CATEGORY_STRIDE, STD_DEV, WINDOW_RADIUS,
+                      MergedCatalog)
+from .coverage import COVERAGE_BUCKETS, COVERAGE_MAX, COVERAGE_SCALE
+from .rarity import RarityDistribution
+
+_EPS = 1e-9
+
+
+class BatchTable:
+    # Versión en arrays del índice ordenado y de los pesos acumulados de un catálogo para un avg
+    def __init__(self, catalog, avg):
+        self.catalog = catalog
+        self.avg = float(avg)
+        self.order = np.asarray(catalog.order, dtype=np.int64)
+        # Claves de búsqueda (en el catálogo combinado incluyen el desplazamiento de la categoría)
+        # y rarezas reales en el mismo orden, para recortar los bordes sin errores de redondeo
+        self.sorted_keys = np.asarray(catalog.sorted_rarities, dtype=np.float64)
+        self.sorted_rarities = np.asarray(catalog.rarities, dtype=np.float64)[self.order] \
+            if len(self.order) else np.zeros(0)
+        weights = np.asarray(catalog.weights(avg), dtype=np.float64)[self.order]
+        self.cum_weights = np.concatenate(([0.0], np.cumsum(weights)))
+        # Mapa de cobertura por categoría (una fila; en el catálogo combinado, una por categoría)
+        coverages = catalog.coverages if isinstance(catalog, MergedCatalog) else [catalog.coverage]
+        self.coverage_targets = np.asarray([coverage.targets for coverage in coverages], dtype=np.int64)
+        self.upgrade_lo, self.upgrade_hi = upgrade_bounds(catalog)
+
+    def resolve_centers(self, rarities: np.ndarray, rows=None) -> np.ndarray:
+        # Versión vectorizada de CoverageMap.resolve; -1 donde el catálogo no tiene elementos
+        buckets = np.clip(np.rint(rarities * COVERAGE_SCALE).astype(np.int64), 0, COVERAGE_BUCKETS - 1)
+        targets = self.coverage_targets[0 if rows is None else rows, buckets]
+        keep = (targets == buckets) & (rarities >= 0.0) & (rarities <= COVERAGE_MAX)
+        return np.where(keep, rarities, np.where(targets >= 0, targets / COVERAGE_SCALE, -1.0))
+
+    def windows(self, centers: np.ndarray, offsets=None):
+        sr = self.sorted_rarities
+        n = len(sr)
+        keys = centers if offsets is None else centers + offsets
+        lo = np.searchsorted(self.sorted_keys, keys - WINDOW_RADIUS - _EPS, side="left")
+        hi = np.searchsorted(self.sorted_keys, keys + WINDOW_RADIUS + _EPS, side="right")
+        if n == 0:
+            return lo, hi
+
+        # Mismo recorte de bordes que Catalog.window (abs(r - x) <= 0.25 exacto)
+        while True:
+            edge = (lo < hi) & (np.abs(sr[np.minimum(lo, n - 1)] - centers) > WINDOW_RADIUS)
+            if not edge.any():
+                break
+            lo[edge] += 1
+        while True:
+            edge = (hi > lo) & (np.abs(sr[np.maximum(hi - 1, 0)] - centers) > WINDOW_RADIUS)
+            if not edge.any():
+                break
+            hi[edge] -= 1
+        return lo, hi
+
+    def pick(self, lo: np.ndarray, hi: np.ndarray, u: np.ndarray) -> np.ndarray:
+        # Selección ponderada dentro de cada ventana [lo, hi) usando los pesos acumulados globales
+        cum = self.cum_weights
+        target = cum[lo] + u * (cum[hi] - cum[lo])
+        pos = np.searchsorted(cum, target, side="right") - 1
+        pos = np.clip(pos, lo, np.maximum(hi - 1, lo))
+        return self.order[np.minimum(pos, len(self.order) - 1)]
+
+
+def upgrade_bounds(catalog):
+    # Ventanas de mejora estrella precalculadas del catálogo, por índice de elemento y en posiciones
+    # del índice ordenado (en el combinado, cada categoría desplazada por su offset)
+    catalogs = catalog.catalogs if isinstance(catalog, MergedCatalog) else [catalog]
+    offsets = catalog.offsets if isinstance(catalog, MergedCatalog) else [0]
+    bounds = [np.asarray(c.upgrade_windows, dtype=np.int64).reshape(-1, 2)[np.asarray(c.upgrade_slots, dtype=np.int64)]
+              + offset for c, offset in zip(catalogs, offsets)]
+    bounds = np.concatenate(bounds) if bounds else np.zeros((0, 2), dtype=np.int64)
+    return bounds[:, 0], bounds[:, 1]
+
+
+_tables = weakref.WeakKeyDictionary()
+_tables_lock = threading.Lock()
+
+
+def get_batch_table(catalog, avg) -> BatchTable:
+    key = float(avg)
+    with _tables_lock:
+        per_catalog = _tables.setdefault(catalog, {})
+        table = per_catalog.get(key)
+    if table is None:
+        table = BatchTable(catalog, key)
+        with _tables_lock:
+            per_catalog[key] = table
+    return table
+
+
+def draw_rarities(rng: np.random.Generator, min_val, max_val, avg, size: int, std_dev=STD_DEV,
+                  bonus_chance=BONUS_CHANCE, bonus_max=BONUS_MAX) -> np.ndarray:
+    # Equivalente vectorizado de RarityDistribution.sample: normal truncada a [min, max] por CDF inversa
+    return RarityDistribution(min_val, max_val, avg, std_dev, bonus_chance=bonus_chance,
+                              bonus_max=bonus_max).sample_array(rng, size)
+
+
+def estimate_luck(rarity: np.ndarray, min_val, max_val) -> np.ndarray:
+    rarity_range = max_val - min_val
+    if rarity_range == 0:
+        return np.full(len(rarity), 100.0)
+    luck = 100.0 * (1 - ((rarity - min_val) / rarity_range))
+    return np.round(np.clip(luck, 0.1, 100.0), 2)
+
+
+class BatchResult:
+    def __init__(self, catalog, min_val, max_val, base_index, upgrade_index, micro, star_u, star_chance):
+        self.catalog = catalog
+        self.min_val = float(min_val)
+        self.max_val = float(max_val)
+        self.base_index = base_index
+        self.upgrade_index = upgrade_index
+        self.micro = micro
+        self.star_u = star_u
+
+        rarities = np.asarray(catalog.rarities, dtype=np.float64)
+        self.base_rarity = rarities[base_index] if len(rarities) else np.zeros(0)
+        self.upgrade_rarity = np.where(upgrade_index >= 0, rarities[np.maximum(upgrade_index, 0)], 0.0) \
+            if len(rarities) else np.zeros(0)
+        # El bonus estrella solo puede activarse si rarity + 2 <= 10
+        self.eligible = self.base_rarity + 2 <= 10
+        self.star = self.star_mask(star_chance)
+        self.index, self.rarity, self.luck = self.resolve(self.star)
+
+    def __len__(self):
+        return len(self.base_index)
+
+    def star_mask(self, star_chance) -> np.ndarray:
+        return (self.star_u < star_chance) & self.eligible
+
+    def resolve(self, star: np.ndarray):
+        upgraded = star & (self.upgrade_index >= 0)
+        index = np.where(upgraded, self.upgrade_index, self.base_index)
+        rarity = np.where(upgraded, np.round(self.upgrade_rarity + self.micro, 2), self.base_rarity)
+        return index, rarity, estimate_luck(rarity, self.min_val, self.max_val)
+
+
+def draw_batch(catalog, min_val, avg, max_val, num_pulls: int, rng: Optional[np.random.Generator] = None,
+               star_chance=BASE_STAR_CHANCE) -> BatchResult:
+    rng = rng if rng is not None else np.random.default_rng()
+    table = get_batch_table(catalog, avg)
+
+    # Modo Random con índice combinado: cada tirada elige su categoría y busca solo en su tramo
+    merged = isinstance(catalog, MergedCatalog)
+    pull_tags = rng.integers(0, len(catalog.catalogs), num_pulls) if merged else None
+
+    # Un solo paso: el mapa de cobertura lleva cada rareza a un centro con la ventana no vacía
+    raritypull = draw_rarities(rng, min_val, max_val, avg, num_pulls)
+    centers = table.resolve_centers(raritypull, pull_tags)
+    instrument.count("batch.redirected", int(np.count_nonzero((centers != raritypull) & (centers >= 0))))
+
+    # Solo un catálogo vacío deja tiradas sin resolver
+    found = centers >= 0
+    if not found.all():
+        instrument.count("batch.dropped", int(num_pulls - found.sum()))
+        centers = centers[found]
+        pull_tags = pull_tags[found] if merged else None
+    lo, hi = table.windows(centers, pull_tags * CATEGORY_STRIDE if merged else None)
+    base_index = table.pick(lo, hi, rng.random(len(centers)))
+    n = len(base_index)
+
+    # La mejora estrella (misma categoría, rareza + 2) sale de las ventanas precalculadas del elemento
+    lo, hi = table.upgrade_lo[base_index], table.upgrade_hi[base_index]
+    has_upgrade = hi > lo
+    upgrade_index = np.full(n, -1, dtype=np.int64)
+    upgrade_index[has_upgrade] = table.pick(lo[has_upgrade], hi[has_upgrade], rng.random(int(has_upgrade.sum())))
+
+    micro = rng.uniform(0.05, 0.40, n)  # microajuste aleatorio de las mejoras
+    star_u = rng.random(n)
+
+    return BatchResult(catalog, min_val, max_val, base_index, upgrade_index, micro, star_u, star_chance)
@@ -0,0 +1,249 @@
+import math
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from . import instrument
+from .coverage import CoverageMap
+from .sampler import SamplerTable
+
+GACHAFILES_DIR = "gachafiles"
+CATEGORIES = ["Ability", "Item", "Familiar", "Trait", "Skill"]
+
+SIGMA = 1.2
+SKEW_STRENGTH = 0.6  # Controla cuánto se aplana del lado derecho
+
+ELEMENT_RE = re.compile(r"^(\d+)\.(\S*)\s*(.*)")
+
+WINDOW_RADIUS = 0.25
+
+# Parámetros de la tirada (compartidos por el motor escalar y el de NumPy)
+STD_DEV = 0.8
+BONUS_CHANCE = 0.0048
+BONUS_MAX = 2.0
+BASE_STAR_CHANCE = 0.0048
+
+_EPS = 1e-9
+
+# Tablas de muestreo que se conservan por catálogo (una por valor de avg)
+MAX_SAMPLER_TABLES = 4
+
+# Separación entre categorías en el índice combinado (mayor que cualquier rareza + ventana)
+CATEGORY_STRIDE = 100.0
+
+
+def custom_weight(rarity: float, avg_rarity: float) -> float:
+    x = (rarity - avg_rarity) / SIGMA
+    skew = 1.0 + SKEW_STRENGTH if rarity > avg_rarity else 1.0 - SKEW_STRENGTH
+    return math.exp(-x * x * skew)
+
+
+class Catalog:
+    def __init__(self, category: str, elements: List[str], rarities: List[float], descriptions: List[str]):
+        self.category = category
+        self.elements = elements
+        self.rarities = rarities
+        self.descriptions = descriptions
+        self._weights: Dict[float, List[float]] = {}
+        self._sampler_tables: "OrderedDict[float, SamplerTable]" = OrderedDict()
+        self._element_index: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+        # Índice ordenado por rareza: cada ventana ±0.25 es un tramo contiguo
+        self.order = sorted(range(len(rarities)), key=rarities.__getitem__)
+        self.sorted_rarities = [rarities[i] for i in self.order]
+        # Rarezas sin elementos a ±0.25 -> centro poblado más cercano (tiradas en un solo paso)
+        self.coverage = CoverageMap(self, WINDOW_RADIUS)
+        self._build_upgrade_index()
+
+    def _build_upgrade_index(self):
+        # Ventana de la mejora estrella (rareza + 2) de cada elemento, precalculada junto al índice:
+        # una por rareza distinta, y cada elemento guarda en qué ranura está la suya
+        self.upgrade_windows: List[tuple] = []
+        slots: Dict[float, int] = {}
+        for r in self.sorted_rarities:
+            if r not in slots:
+                slots[r] = len(self.upgrade_windows)
+                self.upgrade_windows.append(self.window(min(10.0, r + 2)))
+        self.upgrade_slots = [slots[r] for r in self.rarities]
+
+    def __len__(self):
+        return len(self.elements)
+
+    def weights(self, avg) -> List[float]:
+        # Los pesos solo dependen del promedio, así que se memorizan por valor de avg
+        key = float(avg)
+        weights = self._weights.get(key)
+        if weights is None:
+            weights = [custom_weight(r, key) for r in self.rarities]
+            with self._lock:
+                self._weights[key] = weights
+        return weights
+
+    def sampler_table(self, avg) -> SamplerTable:
+        key = float(avg)
+        with self._lock:
+            table = self._sampler_tables.get(key)
+            if table is not None:
+                self._sampler_tables.move_to_end(key)
+                return table
+        table = SamplerTable(self, key)
+        with self._lock:
+            table = self._sampler_tables.setdefault(key, table)
+            while len(self._sampler_tables) > MAX_SAMPLER_TABLES:
+                self._sampler_tables.popitem(last=False)
+        return table
+
+    def index_of(self, element: str) -> Optional[int]:
+        # Mapa nombre -> índice, construido solo si se necesita (importaciones)
+        if self._element_index is None:
+            self._element_index = {name: i for i, name in reversed(list(enumerate(self.elements)))}
+        return self._element_index.get(element)
+
+    def window(self, center: float, radius: float = WINDOW_RADIUS):
+        sr = self.sorted_rarities
+        lo = bisect_left(sr, center - radius - _EPS)
+        hi = bisect_right(sr, center + radius + _EPS)
+        # Recortar los bordes con la misma comparación que el filtro original
+        while lo < hi and abs(sr[lo] - center) > radius:
+            lo += 1
+        while hi > lo and abs(sr[hi - 1] - center) > radius:
+            hi -= 1
+        return lo, hi
+
+    def window_indices(self, center: float, radius: float = WINDOW_RADIUS) -> List[int]:
+        lo, hi = self.window(center, radius)
+        return self.order[lo:hi]
+
+
+class MergedCatalog:
+    # Índice combinado de todas las categorías para el modo "Random".
+    # Cada categoría ocupa su propio tramo del índice ordenado (rareza + id * CATEGORY_STRIDE),
+    # así una misma búsqueda sirve para todas las tiradas y ninguna ventana cruza categorías.
+    category = "Random"
+
+    def __init__(self, catalogs: List[Catalog]):
+        self.catalogs = catalogs
+        self.offsets = []
+        self.elements, self.rarities, self.tags = [], [], []
+        self.order, self.sorted_rarities = [], []
+        for tag, catalog in enumerate(catalogs):
+            offset = len(self.elements)
+            self.offsets.append(offset)
+            self.elements.extend(catalog.elements)
+            self.rarities.extend(catalog.rarities)
+            self.tags.extend([tag] * len(catalog))
+            self.order.extend(offset + i for i in catalog.order)
+            self.sorted_rarities.extend(r + tag * CATEGORY_STRIDE for r in catalog.sorted_rarities)
+        # Los mapas de cobertura son los de cada categoría: una tirada nunca sale de su tramo
+        self.coverages = [catalog.coverage for catalog in catalogs]
+        self._weights: Dict[float, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.elements)
+
+    def weights(self, avg) -> List[float]:
+        key = float(avg)
+        weights = self._weights.get(key)
+        if weights is None:
+            weights = [w for catalog in self.catalogs for w in catalog.weights(key)]
+            with self._lock:
+                self._weights[key] = weights
+        return weights
+
+    def split(self, index: int):
+        # Índice combinado -> (catálogo de su categoría, índice local)
+        tag = self.tags[index]
+        return self.catalogs[tag], index - self.offsets[tag]
+
+
+def parse_gachafile(path: str, category: str) -> Catalog:
+    elements, rarities, descriptions = [], [], []
+
+    with open(path, "r", encoding="utf-8") as file:
+        temp_description = []
+
+        for line in file:
+            if ELEMENT_RE.match(line):
+                parts = line.strip().split(",")
+                if len(parts) >= 2:
+                    element = parts[0].strip()
+                    try:
+                        rarity = float(parts[1])
+                    except ValueError:
+                        continue
+
+                    # Las líneas acumuladas son la descripción del elemento anterior (vacía si no tenía):
+                    # siempre una descripción por elemento, así el índice nunca se sale de la lista
+                    if elements:
+                        descriptions.append(" ".join(temp_description).strip())
+                    temp_description = []
+
+                    elements.append(element)
+                    rarities.append(rarity)
+            else:
+                temp_description.append(line)
+
+        if elements:
+            descriptions.append(" ".join(temp_description).strip())
+
+    return Catalog(category, elements, rarities, descriptions)
+
+
+# Caché compartida por todo el proceso (todas las sesiones de Streamlit)
+_cache: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+def _file_signature(path: str):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_catalog(category: str, folder: str = GACHAFILES_DIR) -> Catalog:
+    path = os.path.join(folder, f"{category}.txt")
+    signature = _file_signature(path)
+
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == signature:
+        instrument.count("catalog.cache_hits")
+        return cached[1]
+
+    with _cache_lock:
+        # Otra sesión pudo haberlo cargado mientras esperábamos el lock
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        instrument.count("catalog.cache_misses")
+        with instrument.timer("catalog.parse"):
+            catalog = parse_gachafile(path, category.capitalize())
+        _cache[path] = (signature, catalog)
+        return catalog
+
+
+_merged_cache: Dict[str, MergedCatalog] = {}
+
+
+def get_merged_catalog(folder: str = GACHAFILES_DIR) -> MergedCatalog:
+    # Se reconstruye solo si alguno de los catálogos cambió (get_catalog devuelve el mismo objeto si no)
+    catalogs = [get_catalog(category, folder) for category in CATEGORIES]
+    merged = _merged_cache.get(folder)
+    if merged is not None and all(a is b for a, b in zip(merged.catalogs, catalogs)):
+        return merged
+    merged = MergedCatalog(catalogs)
+    with _cache_lock:
+        _merged_cache[folder] = merged
+    return merged
+
+
+def invalidate_catalog(category: Optional[str] = None, folder: str = GACHAFILES_DIR):
+    with _cache_lock:
+        _merged_cache.pop(folder, None)
+        if category is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.join(folder, f"{category}.txt"), None)
@@ -0,0 +1,70 @@
+# Mapa de cobertura de un catálogo: qué rarezas sorteadas (redondeadas a 0.01) tienen algún elemento
+# a ±0.25 y, para las que no, cuál es el centro poblado más cercano. Se calcula al cargar el catálogo,
+# así cada tirada se resuelve en un solo paso, sin reintentos ni tiradas descartadas.
+from typing import List, Optional, Tuple
+
+COVERAGE_SCALE = 100  # cubetas de 0.01, la misma precisión que las rarezas sorteadas
+COVERAGE_MAX = 10.0
+COVERAGE_BUCKETS = int(COVERAGE_MAX * COVERAGE_SCALE) + 1  # 0.00 .. 10.00
+
+
+def covered_intervals(sorted_rarities: List[float], radius: float) -> List[Tuple[float, float]]:
+    # Unión de los intervalos [r - radius, r + radius]: donde una ventana encuentra algún elemento
+    intervals = []
+    for r in sorted_rarities:
+        if intervals and r - radius <= intervals[-1][1]:
+            intervals[-1] = (intervals[-1][0], r + radius)
+        else:
+            intervals.append((r - radius, r + radius))
+    return intervals
+
+
+class CoverageMap:
+    def __init__(self, catalog, radius: float):
+        self.intervals = covered_intervals(catalog.sorted_rarities, radius)
+        # Cubetas con ventana no vacía, comprobadas con la misma búsqueda que usan las tiradas
+        populated = [False] * COVERAGE_BUCKETS
+        for start, end in self.intervals:
+            first = max(0, int(start * COVERAGE_SCALE) - 1)
+            last = min(COVERAGE_BUCKETS - 1, int(end * COVERAGE_SCALE) + 1)
+            for b in range(first, last + 1):
+                if not populated[b]:
+                    lo, hi = catalog.window(b / COVERAGE_SCALE, radius)
+                    populated[b] = lo < hi
+
+        # Cubeta poblada más cercana (empate: la inferior); -1 si el catálogo está vacío
+        self.targets = [-1] * COVERAGE_BUCKETS
+        last = -1
+        for b in range(COVERAGE_BUCKETS):
+            if populated[b]:
+                last = b
+            self.targets[b] = last
+        following = -1
+        for b in range(COVERAGE_BUCKETS - 1, -1, -1):
+            if populated[b]:
+                following = b
+            previous = self.targets[b]
+            if following >= 0 and (previous < 0 or following - b < b - previous):
+                self.targets[b] = following
+
+    def __bool__(self):
+        return bool(self.intervals)
+
+    @staticmethod
+    def bucket(rarity: float) -> int:
+        return min(max(int(round(rarity * COVERAGE_SCALE)), 0), COVERAGE_BUCKETS - 1)
+
+    def covered(self, rarity: float) -> bool:
+        b = self.bucket(rarity)
+        return 0.0 <= rarity <= COVERAGE_MAX and self.targets[b] == b
+
+    def resolve(self, rarity: float) -> Optional[float]:
+        # Centro de ventana para una rareza sorteada: ella misma si su ventana tiene elementos,
+        # si no el centro poblado más cercano
+        b = self.bucket(rarity)
+        target = self.targets[b]
+        if target < 0:
+            return None
+        # Fuera de [0, COVERAGE_MAX] la cubeta está recortada al borde: la rareza en sí no está cubierta
+        in_range = 0.0 <= rarity <= COVERAGE_MAX
+        return rarity if target == b and in_range else target / COVERAGE_SCALE
@@ -0,0 +1,24 @@
+from functools import lru_cache
+
+import numpy as np
+
+from .catalog import BONUS_CHANCE, BONUS_MAX, SIGMA, SKEW_STRENGTH
+
+CURVE_POINTS = 500
+
+
+def skewed_gauss(x: np.ndarray, avg: float) -> np.ndarray:
+    # Curva de la gráfica: más estrecha por encima de la media que por debajo
+    skew = np.where(x > avg, 1.0 + SKEW_STRENGTH, 1.0 - SKEW_STRENGTH)
+    return np.exp(-((x - avg) ** 2) / (2 * SIGMA ** 2) * skew)
+
+
+@lru_cache(maxsize=32)
+def bell_curves(min_val: float, avg: float, max_val: float, points: int = CURVE_POINTS):
+    # Solo depende de (min, avg, max): se calcula una vez y se comparte entre categorías y reruns
+    x = np.linspace(min_val, max_val, points)
+    skewed = skewed_gauss(x, avg)
+    bonus = skewed + BONUS_CHANCE * np.exp(-((x - (avg + BONUS_MAX / 2)) ** 2) / (2 * SIGMA ** 2))
+    for values in (x, skewed, bonus):
+        values.flags.writeable = False
+    return x, skewed, bonus
@@ -1,42 +1,201 @@
 import random
-from .tracker import GachaHistoryTracker
-from .utils import get_tier_and_color
-
-tracker = GachaHistoryTracker()
-
-def perform_gacha_draw(mode, min_val, avg, max_val, boost_transcendent=False):
-    from .utils import run_gacha
-
-    if boost_transcendent and tracker.get_points() < 200:
-        boost_transcendent = False
-
-    # Tirada normal
-    result = run_gacha(mode, min_val, avg, max_val)
-
-    if result:
-        tier, color = get_tier_and_color(result["rarity"])
-        pull_data = {
-            "Type": result["type"],
-            "Element": result["element"],
-            "Rarity": f"{result['rarity']:.2f}",
-            "Tier": tier,
-            "Luck": f"{result['luck']:.2f}%",
-            "Description": result["description"],
-            "Color": color
-        }
-
-        # Comprobar repetición
-        repeated = tracker.check_repeat(pull_data)
-        pull_data["Repeated"] = repeated
-
-        # Aplicar boost si hay puntos suficientes
-        if boost_transcendent and not repeated:
-            success = random.random() < 0.25  # 25% de chance de convertir a "Transcendent"
-            if success:
-                pull_data["Tier"] = "Transcendent"
-                pull_data["Rarity"] = "10.00"
-                pull_data["Color"] = "#ff0000"
-                tracker.spend_points(200)
-
-        return pull_data
-    return None
\ No newline at end of file
+from typing import List, NamedTuple, Optional
+
+from . import instrument
+from .catalog import BASE_STAR_CHANCE, GACHAFILES_DIR, get_catalog, get_merged_catalog
+from .rarity import RarityDistribution
+from .records import FLAG_BOOSTED, FLAG_REPEATED, FLAG_STAR, PullRecord
+from .storage import repeat_key
+
+# A partir de este número de tiradas se usa el motor vectorizado de NumPy
+BATCH_THRESHOLD = 100
+
+
+class DrawConfig(NamedTuple):
+    mode: str  # categoría o "Random"
+    min_val: float
+    avg: float
+    max_val: float
+    boost_transcendent: bool = False
+
+
+def boost_star_chance(tp: int) -> float:
+    # El boost solo aplica con 5 TP o más y se limita al 50%
+    return min(0.0023 * tp, 0.50) if tp >= 5 else 0.0
+
+
+def compute_luck(rarity, min_val, max_val):
+    rarity_range = max_val - min_val
+    if rarity_range == 0:
+        return 100.0
+    distance_from_min = rarity - min_val
+    return max(0.1, min(100.0, 100.0 * (1 - (distance_from_min / rarity_range))))
+
+
+class GachaEngine:
+    # Motor de tiradas sin Streamlit: catálogos (caché del proceso), muestreadores y RNG propios.
+    # El tracker es opcional; sin él no hay repetidos ni TP (simulaciones, benchmarks, workers).
+    def __init__(self, tracker=None, seed=None, folder: str = GACHAFILES_DIR):
+        self.tracker = tracker
+        self.folder = folder
+        self.seed = seed
+        self.random = random.Random(seed)
+        self._np_rng = None
+
+    @property
+    def np_rng(self):
+        # NumPy solo se carga la primera vez que se hace una tirada por lotes
+        if self._np_rng is None:
+            import numpy as np
+            self._np_rng = np.random.default_rng(self.seed)
+        return self._np_rng
+
+    def catalog(self, mode: str):
+        # El parseo se hace una sola vez por edición del archivo (caché por mtime/tamaño).
+        # "Random" devuelve el índice combinado: la categoría se elige en cada tirada
+        if mode == "Random":
+            return get_merged_catalog(self.folder)
+        return get_catalog(mode, self.folder)
+
+    def points(self) -> int:
+        return self.tracker.get_points() if self.tracker is not None else 0
+
+    def draw(self, config: DrawConfig, n: int = 1) -> List[PullRecord]:
+        if self.tracker is not None:
+            self.tracker.sync()
+        instrument.count("draw.pulls_requested", n)
+
+        if n >= BATCH_THRESHOLD:
+            with instrument.timer("draw.batch"):
+                results = self._draw_batch(config, n)
+        else:
+            with instrument.timer("draw.scalar"):
+                results = self._draw_scalar(config, n)
+
+        # Un solo flush del journal del tracker por llamada, no una reescritura por tirada
+        if self.tracker is not None:
+            self._apply_flush_report(self.tracker.flush(), results)
+        return results
+
+    def _apply_flush_report(self, report, results: List[PullRecord]):
+        # Otra sesión se adelantó: los registros reflejan lo que de verdad quedó guardado
+        if not report:
+            return
+        late = set(report.late_repeats)
+        for record in results:
+            if not late:
+                break
+            key = repeat_key(record.type, record.base_element)
+            if key in late and not record.repeated:
+                late.discard(key)
+                record.flags |= FLAG_REPEATED
+                record.tp_delta += 1
+
+        # Los gastos de esta tirada son los últimos del lote; un gasto rechazado deja la estrella
+        # pero sin boost cobrado
+        boosted = [record for record in results if record.flags & FLAG_BOOSTED]
+        offset = report.spends - len(boosted)
+        for position, cost in report.rejected_spends:
+            if position >= offset:
+                record = boosted[position - offset]
+                record.flags &= ~FLAG_BOOSTED
+                record.tp_delta += cost
+
+    def _record(self, catalog, selected, rarity, estimated_luck, star, boosted_star, tp) -> PullRecord:
+        record = PullRecord(catalog, selected, round(rarity, 2), round(estimated_luck, 2),
+                            FLAG_STAR if star else 0)
+        if self.tracker is None:
+            return record
+
+        if self.tracker.check_element(record.type, record.element):
+            record.flags |= FLAG_REPEATED
+            record.tp_delta += 1
+
+        if boosted_star and self.tracker.spend_points(tp):
+            record.flags |= FLAG_BOOSTED
+            record.tp_delta -= tp
+        return record
+
+    def _draw_scalar(self, config: DrawConfig, n: int) -> List[PullRecord]:
+        min_val, avg, max_val = config.min_val, config.avg, config.max_val
+        rng = self.random
+        results = []
+        catalog = self.catalog(config.mode)
+        # En modo Random cada tirada usa el subíndice de una categoría elegida al azar
+        choices = catalog.catalogs if config.mode == "Random" else [catalog]
+        tables = [(choice, choice.sampler_table(avg)) for choice in choices]
+        distribution = RarityDistribution(min_val, max_val, avg)
+
+        for _ in range(n):
+            catalog, samplers = tables[rng.randrange(len(tables))] if len(tables) > 1 else tables[0]
+            # El mapa de cobertura lleva las rarezas sin elementos cerca al centro poblado más cercano:
+            # la ventana nunca está vacía y no hace falta volver a sortear
+            raritypull = distribution.sample(rng)
+            center = catalog.coverage.resolve(raritypull)
+            if center is None:
+                instrument.count("draw.dropped")  # catálogo vacío
+                continue
+            if center != raritypull:
+                instrument.count("draw.redirected")
+            rarities = catalog.rarities
+
+            # Ventana ±0.25 con pesos acumulados precalculados (se construye una vez por rareza y avg)
+            selected = samplers.sampler(center).sample(rng)
+            rarity = rarities[selected]
+            bonus_triggered = False
+
+            tp = self.points()
+            boost = boost_star_chance(tp) if config.boost_transcendent else 0.0
+
+            # Nuevo bonus estrella con reevaluación y microajuste aleatorio
+            if rng.random() < BASE_STAR_CHANCE + boost and rarity + 2 <= 10:
+                upgraded = samplers.upgrade(selected)
+
+                if upgraded is not None:
+                    selected = upgraded.sample(rng)
+                    rarity = round(rarities[selected] + rng.uniform(0.05, 0.40), 2)  # microajuste aleatorio
+
+                bonus_triggered = True
+
+            estimated_luck = compute_luck(rarity, min_val, max_val)
+            results.append(self._record(catalog, selected, rarity, estimated_luck, bonus_triggered,
+                                        bonus_triggered and boost > 0, tp))
+
+        return results
+
+    def _draw_batch(self, config: DrawConfig, n: int) -> List[PullRecord]:
+        from .batch import draw_batch
+
+        min_val, max_val = config.min_val, config.max_val
+        catalog = self.catalog(config.mode)
+        batch = draw_batch(catalog, min_val, config.avg, max_val, n, rng=self.np_rng)
+        merged = config.mode == "Random"
+        results = []
+
+        # Rareza, ventanas y candidatos de mejora ya vienen en arrays; aquí solo se resuelve
+        # el bonus estrella en orden, porque su probabilidad depende de los TP de cada momento
+        for i in range(len(batch)):
+            tp = self.points()
+            boost = boost_star_chance(tp) if config.boost_transcendent else 0.0
+
+            bonus_triggered = bool(batch.eligible[i]) and batch.star_u[i] < BASE_STAR_CHANCE + boost
+            if bonus_triggered and batch.upgrade_index[i] >= 0:
+                selected = int(batch.upgrade_index[i])
+                rarity = round(float(batch.upgrade_rarity[i] + batch.micro[i]), 2)
+            else:
+                selected = int(batch.base_index[i])
+                rarity = float(batch.base_rarity[i])
+
+            estimated_luck = compute_luck(rarity, min_val, max_val)
+            # Los registros siempre apuntan al catálogo de su categoría, no al índice combinado
+            source, selected = catalog.split(selected) if merged else (catalog, selected)
+            results.append(self._record(source, selected, rarity, estimated_luck, bonus_triggered,
+                                        bonus_triggered and boost > 0, tp))
+        return results
+
+
+def perform_gacha_draw(mode, min_val, avg, max_val, boost_transcendent=False, tracker=None) -> Optional[dict]:
+    # Compatibilidad: una sola tirada como dict de exportación
+    engine = GachaEngine(tracker=tracker)
+    results = engine.draw(DrawConfig(mode, min_val, avg, max_val, boost_transcendent), 1)
+    return results[0].to_dict() if results else None
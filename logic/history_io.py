@@ -0,0 +1,128 @@
+import csv
+import io
+from typing import BinaryIO, Iterator, TextIO
+
+import pandas as pd
+
+from .records import EXPORT_COLUMNS, records_to_columns
+
+REQUIRED_COLS = {"Type", "Element", "Rarity", "Tier", "Luck", "Description", "Color"}
+CANDIDATE_SEPARATORS = ["\t", ";", ","]
+CHUNK_SIZE = 20000
+
+
+class HistoryFormatError(ValueError):
+    def __init__(self, missing, columns):
+        super().__init__(f"Missing columns: {', '.join(sorted(missing))}")
+        self.missing = missing
+        self.columns = columns
+
+
+def sniff_header(header_line: str):
+    # Se elige el separador que da más columnas en la cabecera (tab > ; > , en caso de empate)
+    best_sep, best_cols = ",", [header_line.strip()]
+    for sep in CANDIDATE_SEPARATORS:
+        cols = next(csv.reader([header_line.rstrip("\r\n")], delimiter=sep))
+        if len(cols) > len(best_cols):
+            best_sep, best_cols = sep, cols
+    return best_sep, [c.strip() for c in best_cols]
+
+
+def clean_history_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df["Rarity"] = pd.to_numeric(df["Rarity"], errors="coerce")
+    df["Luck"] = df["Luck"].astype(str).str.replace('%', '', regex=False)
+    df["Luck"] = pd.to_numeric(df["Luck"], errors="coerce")
+
+    if "Notes" in df.columns:
+        df["Notes"] = df["Notes"].fillna("").astype(str)
+    else:
+        df["Notes"] = ""
+
+    if "TPDelta" in df.columns:
+        df["TPDelta"] = pd.to_numeric(df["TPDelta"], errors="coerce")
+    return df
+
+
+def open_history_csv(stream: TextIO, chunksize: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    # La cabecera se lee y valida aquí mismo (no en el primer next()): un archivo inválido lanza
+    # HistoryFormatError antes de que quien importa toque el tracker. El resto va por bloques
+    header_line = stream.readline().lstrip("\ufeff")
+    sep, columns = sniff_header(header_line)
+
+    missing = REQUIRED_COLS - set(columns)
+    if missing:
+        raise HistoryFormatError(missing, columns)
+
+    reader = pd.read_csv(stream, sep=sep, names=columns, header=None, chunksize=chunksize)
+    return (clean_history_frame(chunk) for chunk in reader)
+
+
+# ------------------ EXPORTACIÓN / PARQUET ------------------
+
+EXPORT_BATCH = 50000
+
+
+def _export_batches(records, batch_size: int = EXPORT_BATCH):
+    for start in range(0, len(records), batch_size):
+        yield records_to_columns(records[start:start + batch_size])
+
+
+def write_history_csv(records, buffer: BinaryIO, batch_size: int = EXPORT_BATCH):
+    # Se escribe por lotes directamente en bytes: no queda una copia en str del historial entero
+    text = io.TextIOWrapper(buffer, encoding="utf-8-sig", newline="")
+    header = True
+    for columns in _export_batches(records, batch_size):
+        pd.DataFrame(columns).to_csv(text, index=False, header=header)
+        header = False
+    if header:
+        pd.DataFrame(columns=EXPORT_COLUMNS).to_csv(text, index=False)
+    text.flush()
+    text.detach()
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet support needs the 'pyarrow' package (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
+
+
+def write_history_parquet(records, buffer: BinaryIO, batch_size: int = EXPORT_BATCH, compression: str = "zstd"):
+    pa, pq = _require_pyarrow()
+    schema = pa.schema([
+        ("Type", pa.string()),
+        ("Element", pa.string()),
+        ("Rarity", pa.float64()),
+        ("Tier", pa.string()),
+        ("LuckValue", pa.float64()),
+        ("Luck", pa.string()),
+        ("Description", pa.string()),
+        ("Color", pa.string()),
+        ("Notes", pa.string()),
+        ("TPDelta", pa.int64()),
+    ])
+    with pq.ParquetWriter(buffer, schema, compression=compression) as writer:
+        for columns in _export_batches(records, batch_size):
+            # Rarity como número en Parquet; en CSV sigue saliendo con formato "x.xx"
+            columns["Rarity"] = [float(value) for value in columns["Rarity"]]
+            writer.write_table(pa.table(columns, schema=schema))
+
+
+def parquet_row_count(stream: BinaryIO) -> int:
+    _, pq = _require_pyarrow()
+    return pq.ParquetFile(stream).metadata.num_rows
+
+
+def open_history_parquet(stream: BinaryIO, chunksize: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    # Igual que open_history_csv: el esquema se valida antes de devolver el lector
+    _, pq = _require_pyarrow()
+    parquet_file = pq.ParquetFile(stream)
+    columns = parquet_file.schema_arrow.names
+
+    missing = REQUIRED_COLS - set(columns)
+    if missing:
+        raise HistoryFormatError(missing, columns)
+
+    return (clean_history_frame(batch.to_pandas()) for batch in parquet_file.iter_batches(batch_size=chunksize))
@@ -0,0 +1,140 @@
+# Instrumentación ligera de los caminos críticos (parseo, ventanas, reintentos, escrituras del tracker).
+# Solo se mide cuando hay un Metrics activo en el hilo actual; si no, timer() y count() no hacen nada.
+import io
+import json
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, Optional
+
+logger = logging.getLogger("cgw.metrics")
+
+_local = threading.local()
+_NULL_TIMER = nullcontext()
+
+
+class Metrics:
+    def __init__(self):
+        self.timers: Dict[str, list] = {}  # nombre -> [llamadas, total_s, max_s]
+        self.counters: Dict[str, int] = {}
+
+    def add_time(self, name: str, seconds: float):
+        entry = self.timers.get(name)
+        if entry is None:
+            self.timers[name] = [1, seconds, seconds]
+            return
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict:
+        return {
+            "timers": {
+                name: {"count": calls, "total_ms": 1000 * total, "mean_ms": 1000 * total / calls,
+                       "max_ms": 1000 * longest}
+                for name, (calls, total, longest) in sorted(self.timers.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: Metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def current() -> Optional[Metrics]:
+    return getattr(_local, "metrics", None)
+
+
+def activate(metrics: Optional[Metrics] = None) -> Metrics:
+    # Cada rerun de Streamlit corre en el hilo de su sesión: las métricas no se mezclan entre sesiones
+    _local.metrics = metrics if metrics is not None else Metrics()
+    return _local.metrics
+
+
+def deactivate() -> Optional[Metrics]:
+    metrics = current()
+    _local.metrics = None
+    return metrics
+
+
+def timer(name: str):
+    metrics = current()
+    return _NULL_TIMER if metrics is None else _Timer(metrics, name)
+
+
+def count(name: str, n: int = 1):
+    metrics = current()
+    if metrics is not None:
+        metrics.count(name, n)
+
+
+def log_metrics(metrics: Metrics, **context):
+    # Una línea JSON por rerun, para poder filtrarla o agregarla desde los logs
+    logger.info(json.dumps({**context, **metrics.snapshot()}, ensure_ascii=False))
+
+
+class RunProfiler:
+    # Captura opcional de cProfile y tracemalloc durante un rerun.
+    # tracemalloc es global al proceso: con varias sesiones a la vez también ve sus asignaciones.
+    def __init__(self, cpu: bool = False, memory: bool = False, top: int = 25):
+        import cProfile
+
+        self.profile = cProfile.Profile() if cpu else None
+        self.memory = memory
+        self.top = top
+        self._started_tracing = False
+        self._memory_start = None
+
+    def start(self):
+        import tracemalloc
+
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.take_snapshot()
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def stop(self) -> Dict:
+        import pstats
+        import tracemalloc
+
+        report = {}
+        if self.profile is not None:
+            self.profile.disable()
+            out = io.StringIO()
+            pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(self.top)
+            report["cprofile"] = out.getvalue()
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            stats = snapshot.compare_to(self._memory_start, "lineno")[:self.top]
+            report["tracemalloc"] = {
+                "current_kb": current_bytes / 1024,
+                "peak_kb": peak_bytes / 1024,
+                "top": [str(stat) for stat in stats],
+            }
+            if self._started_tracing:
+                tracemalloc.stop()
+        return report
@@ -0,0 +1,170 @@
+# Distribución de la rareza sorteada: normal (opcionalmente asimétrica) truncada a [min, max],
+# muestreada por CDF inversa. Sin reintentos ni clamp: siempre 3 números aleatorios por tirada
+# (bonus sí/no, desplazamiento del bonus, posición en la CDF).
+import math
+from statistics import NormalDist
+
+from .catalog import BONUS_CHANCE, BONUS_MAX, STD_DEV
+
+_STD_NORMAL = NormalDist()
+_P_MIN = 1e-300
+_SQRT2 = math.sqrt(2.0)
+
+# Coeficientes de AS241 (Wichura, 1988), los mismos que usa statistics.NormalDist.inv_cdf
+_CENTRAL_NUM = (2.5090809287301226727e+3, 3.3430575583588128105e+4, 6.7265770927008700853e+4,
+                4.5921953931549871457e+4, 1.3731693765509461125e+4, 1.9715909503065514427e+3,
+                1.3314166789178437745e+2, 3.3871328727963666080e+0)
+_CENTRAL_DEN = (5.2264952788528545610e+3, 2.8729085735721942674e+4, 3.9307895800092710610e+4,
+                2.1213794301586595867e+4, 5.3941960214247511077e+3, 6.8718700749205790830e+2,
+                4.2313330701600911252e+1, 1.0)
+_TAIL_NUM = (7.74545014278341407640e-4, 2.27238449892691845833e-2, 2.41780725177450611770e-1,
+             1.27045825245236838258e+0, 3.64784832476320460504e+0, 5.76949722146069140550e+0,
+             4.63033784615654529590e+0, 1.42343711074968357734e+0)
+_TAIL_DEN = (1.05075007164441684324e-9, 5.47593808499534494600e-4, 1.51986665636164571966e-2,
+             1.48103976427480074590e-1, 6.89767334985100004550e-1, 1.67638483018380384940e+0,
+             2.05319162663775882187e+0, 1.0)
+_FAR_NUM = (2.01033439929228813265e-7, 2.71155556874348757815e-5, 1.24266094738807843860e-3,
+            2.65321895265761230930e-2, 2.96560571828504891230e-1, 1.78482653991729133580e+0,
+            5.46378491116411436990e+0, 6.65790464350110377720e+0)
+_FAR_DEN = (2.04426310338993978564e-15, 1.42151175831644588870e-7, 1.84631831751005468180e-5,
+            7.86869131145613259100e-4, 1.48753612908506148525e-2, 1.36929880922735805310e-1,
+            5.99832206555887937690e-1, 1.0)
+
+
+def _phi(z: float) -> float:
+    # CDF normal estándar con erfc: en la cola izquierda conserva la precisión relativa
+    # (NormalDist.cdf usa erf y devuelve 0 exacto más allá de ~8 sigmas)
+    return 0.5 * math.erfc(-z / _SQRT2)
+
+
+def _poly(coefs, x):
+    result = 0.0
+    for c in coefs:
+        result = result * x + c
+    return result
+
+
+def ndtri(p):
+    # Inversa de la CDF normal estándar para arrays de NumPy (AS241 vectorizado)
+    import numpy as np
+
+    p = np.asarray(p, dtype=np.float64)
+    q = p - 0.5
+    x = np.empty_like(p)
+
+    central = np.abs(q) <= 0.425
+    qc = q[central]
+    r = 0.180625 - qc * qc
+    x[central] = qc * _poly(_CENTRAL_NUM, r) / _poly(_CENTRAL_DEN, r)
+
+    tail = ~central
+    qt = q[tail]
+    r = np.sqrt(-np.log(np.where(qt <= 0.0, p[tail], 1.0 - p[tail])))
+    near = r <= 5.0
+    rn = r - 1.6
+    rf = r - 5.0
+    xt = np.where(near, _poly(_TAIL_NUM, rn) / _poly(_TAIL_DEN, rn), _poly(_FAR_NUM, rf) / _poly(_FAR_DEN, rf))
+    x[tail] = np.where(qt < 0.0, -xt, xt)
+    return x
+
+
+class RarityDistribution:
+    # Normal partida (sigma distinta a cada lado del centro) truncada a [min, max].
+    # skew > 0 alarga la cola derecha; skew = 0 es la normal truncada clásica.
+    # Con probabilidad bonus_chance el centro se desplaza uniform(0.1, bonus_max) hacia arriba.
+    # Solo min == max degenera (masa puntual en min); los intervalos lejos de avg siguen siendo la cola exacta.
+    def __init__(self, min_val, max_val, avg, std_dev=STD_DEV, skew=0.0, bonus_chance=BONUS_CHANCE,
+                 bonus_max=BONUS_MAX):
+        if not -1.0 < skew < 1.0:
+            raise ValueError("skew must be in (-1, 1)")
+        self.min_val = float(min_val)
+        self.max_val = float(max_val)
+        self.avg = float(avg)
+        self.sigma_left = std_dev * (1.0 - skew)
+        self.sigma_right = std_dev * (1.0 + skew)
+        self.weight_left = self.sigma_left / (self.sigma_left + self.sigma_right)
+        self.weight_right = 1.0 - self.weight_left
+        self.bonus_chance = bonus_chance
+        self.bonus_max = bonus_max
+        self._base = self._bounds(self.avg)
+
+    # --- CDF de la normal partida, siempre evaluada en la cola (argumento <= 0) ---
+
+    def _lower(self, x, mu):
+        # P(X <= x) sin truncar
+        if x < mu:
+            return 2 * self.weight_left * _phi((x - mu) / self.sigma_left)
+        return 1.0 - self._upper(x, mu)
+
+    def _upper(self, x, mu):
+        # P(X > x) sin truncar
+        if x >= mu:
+            return 2 * self.weight_right * _phi((mu - x) / self.sigma_right)
+        return 1.0 - self._lower(x, mu)
+
+    def _bounds(self, mu):
+        # Si todo el intervalo queda por encima del centro se trabaja con la cola superior,
+        # que no se redondea a 1.0 cuando min está muy lejos de avg
+        if self.min_val >= mu:
+            return mu, True, self._upper(self.max_val, mu), self._upper(self.min_val, mu)
+        return mu, False, self._lower(self.min_val, mu), self._lower(self.max_val, mu)
+
+    def _quantile(self, bounds, u):
+        mu, upper, lo, hi = bounds
+        if hi <= lo:
+            return min(max(mu, self.min_val), self.max_val)
+        p = max(lo + u * (hi - lo), _P_MIN)
+        if upper:
+            # p es P(X > x): siempre en la rama derecha
+            x = mu - self.sigma_right * _STD_NORMAL.inv_cdf(min(p / (2 * self.weight_right), 0.5))
+        elif p < self.weight_left:
+            x = mu + self.sigma_left * _STD_NORMAL.inv_cdf(p / (2 * self.weight_left))
+        else:
+            x = mu - self.sigma_right * _STD_NORMAL.inv_cdf(max((1.0 - p) / (2 * self.weight_right), _P_MIN))
+        return min(max(x, self.min_val), self.max_val)
+
+    def cdf(self, x) -> float:
+        # CDF exacta de la parte sin bonus (normal partida truncada)
+        if x <= self.min_val:
+            return 0.0
+        if x >= self.max_val:
+            return 1.0
+        mu, upper, lo, hi = self._base
+        if hi <= lo:
+            return 1.0 if x >= min(max(mu, self.min_val), self.max_val) else 0.0
+        if upper:
+            return (hi - self._upper(x, mu)) / (hi - lo)
+        return (self._lower(x, mu) - lo) / (hi - lo)
+
+    def sample(self, rng) -> float:
+        bonus = rng.random() < self.bonus_chance
+        shift = rng.uniform(0.1, self.bonus_max)
+        u = rng.random()
+        bounds = self._bounds(self.avg + shift) if bonus else self._base
+        return round(self._quantile(bounds, u), 2)
+
+    def sample_array(self, rng, size: int):
+        import numpy as np
+
+        bonus = rng.random(size) < self.bonus_chance
+        shift = rng.uniform(0.1, self.bonus_max, size)
+        u = rng.random(size)
+
+        mu, upper, lo, hi = self._base
+        if hi <= lo:
+            x = np.full(size, min(max(mu, self.min_val), self.max_val))
+        else:
+            p = np.maximum(lo + u * (hi - lo), _P_MIN)
+            if upper:
+                x = mu - self.sigma_right * ndtri(np.minimum(p / (2 * self.weight_right), 0.5))
+            else:
+                left = p < self.weight_left
+                x = np.empty(size)
+                x[left] = mu + self.sigma_left * ndtri(p[left] / (2 * self.weight_left))
+                right = ~left
+                x[right] = mu - self.sigma_right * ndtri(np.maximum((1.0 - p[right]) / (2 * self.weight_right), _P_MIN))
+
+        # Las tiradas con bonus (~0.5%) tienen otro centro: se resuelven una a una con la versión escalar
+        for i in np.flatnonzero(bonus):
+            x[i] = self._quantile(self._bounds(mu + shift[i]), u[i])
+        return np.round(np.clip(x, self.min_val, self.max_val), 2)
@@ -0,0 +1,164 @@
+from typing import Dict, List, Optional
+
+from .catalog import CATEGORIES, get_catalog
+from .utils import get_tier_and_color
+
+FLAG_REPEATED = 1
+FLAG_STAR = 2
+FLAG_BOOSTED = 4
+
+STAR_PREFIX = "★ "
+
+EXPORT_COLUMNS = ["Type", "Element", "Rarity", "Tier", "LuckValue", "Luck", "Description", "Color", "Notes", "TPDelta"]
+
+
+class PullRecord:
+    # Tirada compacta: referencia al catálogo + índice, números como float y flags en bits.
+    # El texto (nombre, descripción, notas, color) se resuelve solo al mostrar o exportar.
+    __slots__ = ("catalog", "index", "rarity", "luck", "flags", "tp_delta", "text")
+
+    def __init__(self, catalog, index: int, rarity: float, luck: float, flags: int = 0, tp_delta: int = 0,
+                 text: Optional[tuple] = None):
+        self.catalog = catalog
+        self.index = index
+        self.rarity = rarity
+        self.luck = luck
+        self.flags = flags
+        self.tp_delta = tp_delta
+        # Solo para historiales importados que no se pueden enlazar con un catálogo:
+        # (type, element sin estrella, descripción)
+        self.text = text
+
+    @property
+    def type(self) -> str:
+        return self.text[0] if self.text is not None else self.catalog.category
+
+    @property
+    def base_element(self) -> str:
+        return self.text[1] if self.text is not None else self.catalog.elements[self.index]
+
+    @property
+    def element(self) -> str:
+        return STAR_PREFIX + self.base_element if self.flags & FLAG_STAR else self.base_element
+
+    @property
+    def description(self) -> str:
+        if self.text is not None:
+            return self.text[2]
+        return self.catalog.descriptions[self.index].replace("#", "").strip()
+
+    @property
+    def tier(self) -> str:
+        return get_tier_and_color(self.rarity)[0]
+
+    @property
+    def color(self) -> str:
+        return get_tier_and_color(self.rarity)[1]
+
+    @property
+    def repeated(self) -> bool:
+        return bool(self.flags & FLAG_REPEATED)
+
+    @property
+    def boosted(self) -> bool:
+        return bool(self.flags & FLAG_BOOSTED)
+
+    @property
+    def notes(self) -> str:
+        notes = []
+        if self.flags & FLAG_REPEATED:
+            notes.append("🔁 Repeated — +1 TP")
+        if self.flags & FLAG_BOOSTED:
+            spent = (1 if self.flags & FLAG_REPEATED else 0) - self.tp_delta
+            notes.append(f"✨ Boosted Star Bonus — -{spent} TP")
+        return " | ".join(notes)
+
+    def to_dict(self) -> Dict:
+        tier, color = get_tier_and_color(self.rarity)
+        return {
+            "Type": self.type,
+            "Element": self.element,
+            "Rarity": f"{self.rarity:.2f}",
+            "Tier": tier,
+            "LuckValue": self.luck,
+            "Luck": f"{self.luck:.2f}%",
+            "Description": self.description,
+            "Color": color,
+            "Notes": self.notes,
+            "TPDelta": self.tp_delta,
+        }
+
+
+def _resolve_catalog(category: str):
+    if category not in CATEGORIES:
+        return None
+    try:
+        return get_catalog(category)
+    except OSError:
+        return None
+
+
+def _catalog_lookup(category: str, element: str, catalogs: Optional[Dict] = None):
+    # catalogs: caché {categoría: catálogo} de quien importa, para no hacer un os.stat por fila
+    if catalogs is None:
+        catalog = _resolve_catalog(category)
+    elif category in catalogs:
+        catalog = catalogs[category]
+    else:
+        catalog = catalogs[category] = _resolve_catalog(category)
+    if catalog is None:
+        return None, None
+    return catalog, catalog.index_of(element)
+
+
+def records_from_entries(entries: List[Dict]) -> List[PullRecord]:
+    # Un bloque importado: cada catálogo se resuelve una sola vez por bloque
+    catalogs = {}
+    return [record_from_entry(entry, catalogs) for entry in entries]
+
+
+def record_from_entry(entry: Dict, catalogs: Optional[Dict] = None) -> PullRecord:
+    # Convierte una fila importada (CSV/Parquet) en registro compacto
+    from .tracker import entry_tp_delta
+
+    category = str(entry.get("Type", ""))
+    element = str(entry.get("Element", ""))
+    notes = str(entry.get("Notes", "") or "")
+
+    flags = 0
+    if element.startswith(STAR_PREFIX):
+        flags |= FLAG_STAR
+        element = element[len(STAR_PREFIX):]
+    if "Repeated" in notes:
+        flags |= FLAG_REPEATED
+    if "Boosted Star Bonus" in notes:
+        flags |= FLAG_BOOSTED
+
+    rarity = _float_or_zero(entry.get("Rarity"))
+    # LuckValue puede venir vacío (NaN) en exportaciones de historiales sin esa columna: se usa Luck
+    luck = entry.get("LuckValue")
+    if luck is None or luck != luck or str(luck).strip() == "":
+        luck = entry.get("Luck")
+    luck = _float_or_zero(luck)
+    description = str(entry.get("Description", "") or "")
+
+    catalog, index = _catalog_lookup(category, element, catalogs)
+    text = None
+    if index is None or catalog.descriptions[index].replace("#", "").strip() != description:
+        # El catálogo actual no tiene ese elemento (o cambió): se conserva el texto importado
+        catalog, index, text = None, -1, (category, element, description)
+    return PullRecord(catalog, index, round(rarity, 2), round(luck, 2), flags, entry_tp_delta(entry), text)
+
+
+def _float_or_zero(value) -> float:
+    try:
+        value = float(str(value).replace("%", ""))
+    except (TypeError, ValueError):
+        return 0.0
+    return value if value == value else 0.0
+
+
+def records_to_columns(records: List[PullRecord], columns=EXPORT_COLUMNS) -> Dict[str, list]:
+    # Columnas listas para un DataFrame; el texto se resuelve aquí, al exportar
+    rows = [record.to_dict() for record in records]
+    return {col: [row[col] for row in rows] for col in columns}
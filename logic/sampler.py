@@ -0,0 +1,66 @@
+import random
+import threading
+from bisect import bisect
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+from . import instrument
+
+_UNBUILT = object()
+
+
+class WeightedSampler:
+    __slots__ = ("indices", "cum_weights", "total")
+
+    def __init__(self, indices: List[int], weights: List[float]):
+        self.indices = indices
+        self.cum_weights = list(accumulate(weights))
+        self.total = self.cum_weights[-1] if self.cum_weights else 0.0
+
+    def __len__(self):
+        return len(self.indices)
+
+    def sample(self, rng=random) -> int:
+        # Igual que random.choices con cum_weights: un solo random() y una búsqueda binaria
+        hi = len(self.indices) - 1
+        return self.indices[bisect(self.cum_weights, rng.random() * self.total, 0, hi)]
+
+
+class SamplerTable:
+    # Muestreadores precalculados por ventana de rareza para un catálogo y un avg concretos.
+    # Las rarezas sorteadas se redondean a 2 decimales, así que el número de ventanas es finito.
+    def __init__(self, catalog, avg):
+        self.catalog = catalog
+        self.avg = float(avg)
+        self.weights = catalog.weights(avg)
+        self._samplers: Dict[float, Optional[WeightedSampler]] = {}
+        self._upgrades = [_UNBUILT] * len(catalog.upgrade_windows)
+        self._lock = threading.Lock()
+
+    def sampler(self, center: float) -> Optional[WeightedSampler]:
+        try:
+            return self._samplers[center]
+        except KeyError:
+            pass
+
+        with instrument.timer("sampler.window_build"):
+            indices = self.catalog.window_indices(center)
+            sampler = WeightedSampler(indices, [self.weights[i] for i in indices]) if indices else None
+        if sampler is None:
+            instrument.count("sampler.empty_windows")
+        with self._lock:
+            self._samplers[center] = sampler
+        return sampler
+
+    def upgrade(self, index: int) -> Optional[WeightedSampler]:
+        # Muestreador de la mejora estrella del elemento index (ventana en rareza + 2).
+        # Las ventanas vienen del índice del catálogo; aquí solo se añaden los pesos de este avg
+        slot = self.catalog.upgrade_slots[index]
+        sampler = self._upgrades[slot]
+        if sampler is _UNBUILT:
+            with instrument.timer("sampler.upgrade_build"):
+                lo, hi = self.catalog.upgrade_windows[slot]
+                indices = self.catalog.order[lo:hi]
+                sampler = WeightedSampler(indices, [self.weights[i] for i in indices]) if indices else None
+            self._upgrades[slot] = sampler
+        return sampler
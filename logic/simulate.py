@@ -0,0 +1,218 @@
+# Simulación Monte Carlo sin interfaz:
+#   python -m logic.simulate --preset Gold --category Ability --pulls 1000000
+#   python -m logic.simulate --preset Gold --pulls 50000000 --workers 0 --seed 42
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import draw_batch
+from .catalog import BASE_STAR_CHANCE, CATEGORIES, get_catalog, get_merged_catalog
+from .coverage import COVERAGE_MAX
+from .gacha_engine import boost_star_chance
+from .utils import LUCK_CLASSES, LUCK_FLOOR_CLASS, PRESETS, TIERS
+
+# Tiradas por bloque; cada bloque tiene su propio stream de números aleatorios
+CHUNK_PULLS = 100_000
+
+
+def boosted_star_chance(tp: int) -> float:
+    # Misma regla que la app
+    return BASE_STAR_CHANCE + boost_star_chance(tp)
+
+
+def tier_counts(rarity: np.ndarray) -> dict:
+    limits = np.array([limit for limit, _, _ in TIERS])
+    tier_idx = np.minimum(np.searchsorted(limits, rarity, side="right"), len(TIERS) - 1)
+    counts = np.bincount(tier_idx, minlength=len(TIERS))
+    return {name: int(count) for (_, name, _), count in zip(TIERS, counts)}
+
+
+def luck_counts(luck: np.ndarray) -> dict:
+    # classify_luck usa "luck > umbral", así que se cuentan los umbrales estrictamente menores
+    thresholds = np.array([threshold for threshold, _ in reversed(LUCK_CLASSES)])
+    names = [LUCK_FLOOR_CLASS] + [name for _, name in reversed(LUCK_CLASSES)]
+    counts = np.bincount(np.searchsorted(thresholds, luck, side="left"), minlength=len(names))
+    return {name: int(count) for name, count in zip(reversed(names), reversed(counts))}
+
+
+def chunk_summary(batch) -> dict:
+    # Agregados parciales de un bloque; se combinan en orden con merge_summaries
+    n = len(batch)
+    # Igual que el tracker: "★ X" y "X" cuentan como elementos distintos
+    keys = np.unique(batch.index * 2 + batch.star)
+    return {
+        "pulls": n,
+        "rarity": moments(batch.rarity),
+        "luck_sum": float(batch.luck.sum()),
+        "tiers": tier_counts(batch.rarity),
+        "luck": luck_counts(batch.luck),
+        "stars": int(batch.star.sum()),
+        "keys": keys,
+    }
+
+
+def moments(values: np.ndarray):
+    n = len(values)
+    if not n:
+        return 0, 0.0, 0.0
+    mean = float(values.mean())
+    return n, mean, float(((values - mean) ** 2).sum())
+
+
+def merge_moments(a, b):
+    # Combinación de medias y varianzas por bloques (Chan et al.)
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if not n:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+def merge_summaries(parts) -> dict:
+    merged = None
+    for part in parts:
+        if merged is None:
+            merged = dict(part)
+            continue
+        merged["pulls"] += part["pulls"]
+        merged["rarity"] = merge_moments(merged["rarity"], part["rarity"])
+        merged["luck_sum"] += part["luck_sum"]
+        merged["tiers"] = {k: merged["tiers"][k] + part["tiers"][k] for k in merged["tiers"]}
+        merged["luck"] = {k: merged["luck"][k] + part["luck"][k] for k in merged["luck"]}
+        merged["stars"] += part["stars"]
+        merged["keys"] = np.union1d(merged["keys"], part["keys"])
+    return merged
+
+
+def summarize(category: str, merged: dict, pulls_requested: int) -> dict:
+    n = merged["pulls"]
+    _, rarity_mean, rarity_m2 = merged["rarity"]
+    return {
+        "category": category,
+        "pulls_requested": pulls_requested,
+        "pulls": n,
+        "dropped": pulls_requested - n,
+        "rarity_mean": rarity_mean if n else 0.0,
+        "rarity_std": float(np.sqrt(rarity_m2 / n)) if n else 0.0,
+        "luck_mean": merged["luck_sum"] / n if n else 0.0,
+        "tiers": merged["tiers"],
+        "luck": merged["luck"],
+        "star_rate": merged["stars"] / n if n else 0.0,
+        "repeat_rate": (n - len(merged["keys"])) / n if n else 0.0,
+    }
+
+
+def resolve_catalog(category: str, folder=None):
+    # "Random" usa el índice combinado: la categoría se elige en cada tirada
+    if category == "Random":
+        return get_merged_catalog(folder) if folder else get_merged_catalog()
+    return get_catalog(category, folder) if folder else get_catalog(category)
+
+
+def simulate_chunk(task) -> dict:
+    # Función de nivel de módulo para que los workers del pool puedan recibirla
+    category, min_val, avg, max_val, pulls, star_chance, seed_seq, folder = task
+    catalog = resolve_catalog(category, folder)
+    rng = np.random.default_rng(seed_seq)
+    return chunk_summary(draw_batch(catalog, min_val, avg, max_val, pulls, rng=rng, star_chance=star_chance))
+
+
+def run_simulation(category: str, min_val, avg, max_val, pulls: int, tp: int = 0, seed=None, folder=None,
+                   workers: int = 1, chunk_pulls: int = CHUNK_PULLS) -> dict:
+    # Las tiradas se parten en bloques de tamaño fijo y cada bloque recibe su propio stream
+    # (SeedSequence.spawn). El reparto depende solo del número de tiradas, no de los workers,
+    # así que una semilla da el mismo resultado con 1 o con N procesos.
+    seed_seq = np.random.SeedSequence(seed)
+    sizes = [min(chunk_pulls, pulls - start) for start in range(0, pulls, chunk_pulls)]
+    star_chance = boosted_star_chance(tp)
+    tasks = [
+        (category, min_val, avg, max_val, size, star_chance, child, folder)
+        for size, child in zip(sizes, seed_seq.spawn(len(sizes)))
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            # map conserva el orden de los bloques: la combinación es siempre la misma
+            parts = list(pool.map(simulate_chunk, tasks))
+    else:
+        parts = [simulate_chunk(task) for task in tasks]
+
+    catalog = resolve_catalog(category, folder)
+    merged = merge_summaries(parts) if parts else chunk_summary(draw_batch(catalog, min_val, avg, max_val, 0))
+    report = summarize(catalog.category, merged, pulls)
+    report["config"] = {"min": min_val, "avg": avg, "max": max_val, "tp": tp, "seed": seed_seq.entropy,
+                        "workers": workers, "chunk_pulls": chunk_pulls}
+    return report
+
+
+def format_report(report: dict) -> str:
+    n = report["pulls"] or 1
+    lines = [
+        f"{report['category']} — {report['pulls']:,} pulls "
+        f"(min {report['config']['min']}, avg {report['config']['avg']}, max {report['config']['max']})",
+        f"Rarity: mean {report['rarity_mean']:.3f}, std {report['rarity_std']:.3f}",
+        "",
+        "Tier histogram:",
+    ]
+    for name, count in report["tiers"].items():
+        lines.append(f"  {name:<14} {count:>10,}  {100 * count / n:6.2f}%")
+    lines += ["", "Luck distribution:"]
+    for name, count in report["luck"].items():
+        lines.append(f"  {name:<17} {count:>10,}  {100 * count / n:6.2f}%")
+    lines += [
+        "",
+        f"Star bonus rate: {100 * report['star_rate']:.3f}%",
+        f"Repeat rate:     {100 * report['repeat_rate']:.2f}%",
+    ]
+    if report["dropped"]:
+        lines.append(f"Dropped pulls (no element in range): {report['dropped']:,}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Monte Carlo simulation of Chaos Gacha pulls.")
+    parser.add_argument("--preset", choices=list(PRESETS), default="Bronze")
+    parser.add_argument("--category", choices=CATEGORIES + ["Random"], default="Ability")
+    parser.add_argument("--pulls", type=int, default=100000)
+    parser.add_argument("--min", dest="min_val", type=float, help="Override the preset minimum rarity")
+    parser.add_argument("--avg", type=float, help="Override the preset average rarity")
+    parser.add_argument("--max", dest="max_val", type=float, help="Override the preset maximum rarity")
+    parser.add_argument("--tp", type=int, default=0, help="Transcendent Points held (boosts the star bonus)")
+    parser.add_argument("--seed", type=int, help="Master seed; the same seed gives the same report for any --workers")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = one per CPU core)")
+    parser.add_argument("--gachafiles", help="Folder with the category .txt files")
+    parser.add_argument("--json", help="Write the report as JSON to this path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    (min_val, avg, max_val), _ = PRESETS[args.preset]
+    min_val = args.min_val if args.min_val is not None else min_val
+    avg = args.avg if args.avg is not None else avg
+    max_val = args.max_val if args.max_val is not None else max_val
+    # Mismo rango que los sliders de la app
+    for name, value in (("--min", min_val), ("--avg", avg), ("--max", max_val)):
+        if not 0.0 <= value <= COVERAGE_MAX:
+            parser.error(f"{name} must be between 0 and {COVERAGE_MAX:g}")
+
+    report = run_simulation(args.category, min_val, avg, max_val, args.pulls, tp=args.tp,
+                            seed=args.seed, folder=args.gachafiles, workers=args.workers)
+    report["config"]["preset"] = args.preset
+
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import math
+from typing import Dict, Iterable, List
+
+from .records import FLAG_BOOSTED, FLAG_REPEATED, FLAG_STAR
+from .utils import TIERS, get_tier_and_color
+
+# Bins fijos para los histogramas de rareza (independientes de los sliders)
+HIST_MIN = 0.0
+HIST_MAX = 10.0
+HIST_BIN_WIDTH = 0.25
+HIST_BINS = int(round((HIST_MAX - HIST_MIN) / HIST_BIN_WIDTH))
+
+
+class RunningMoments:
+    # Media y varianza acumuladas (Welford): O(1) por valor y sin guardar la serie
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class PullStats:
+    # Estadísticas de la sesión: se actualizan con cada tirada y se reconstruyen al importar,
+    # así los gráficos y resúmenes no tienen que recorrer el historial completo.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.by_category: Dict[str, int] = {}
+        self.by_tier: Dict[str, int] = {}
+        self.by_category_tier: Dict[str, Dict[str, int]] = {}
+        self.histograms: Dict[str, List[int]] = {}
+        self.rarity = RunningMoments()
+        self.luck = RunningMoments()
+        self.stars = 0
+        self.boosted = 0
+        self.repeats = 0
+        self.tp_earned = 0
+        self.tp_spent = 0
+
+    def add(self, record):
+        category = record.type
+        tier = get_tier_and_color(record.rarity)[0]
+
+        self.total += 1
+        self.by_category[category] = self.by_category.get(category, 0) + 1
+        self.by_tier[tier] = self.by_tier.get(tier, 0) + 1
+        tiers = self.by_category_tier.setdefault(category, {})
+        tiers[tier] = tiers.get(tier, 0) + 1
+
+        # Bins fijos; la categoría se compara sin distinguir mayúsculas, como en los gráficos
+        histogram = self.histograms.get(category.lower())
+        if histogram is None:
+            histogram = self.histograms[category.lower()] = [0] * HIST_BINS
+        bin_index = int((record.rarity - HIST_MIN) // HIST_BIN_WIDTH)
+        histogram[min(max(bin_index, 0), HIST_BINS - 1)] += 1
+
+        self.rarity.add(record.rarity)
+        self.luck.add(record.luck)
+
+        flags = record.flags
+        earned = 1 if flags & FLAG_REPEATED else 0
+        if flags & FLAG_STAR:
+            self.stars += 1
+        if flags & FLAG_BOOSTED:
+            self.boosted += 1
+        self.repeats += earned
+        # TPDelta = ganados - gastados; lo gastado solo puede venir del boost de la estrella
+        spent = max(earned - record.tp_delta, 0)
+        self.tp_earned += record.tp_delta + spent
+        self.tp_spent += spent
+
+    def add_many(self, records: Iterable):
+        for record in records:
+            self.add(record)
+
+    def rebuild(self, records: Iterable):
+        self.reset()
+        self.add_many(records)
+
+    @property
+    def star_rate(self) -> float:
+        return self.stars / self.total if self.total else 0.0
+
+    @property
+    def repeat_rate(self) -> float:
+        return self.repeats / self.total if self.total else 0.0
+
+    def histogram_bins(self, category: str):
+        # (inicio, fin, cuenta) de los bins con tiradas
+        histogram = self.histograms.get(category.lower(), ())
+        rows = [(HIST_MIN + i * HIST_BIN_WIDTH, count) for i, count in enumerate(histogram) if count]
+        return [start for start, _ in rows], [start + HIST_BIN_WIDTH for start, _ in rows], [c for _, c in rows]
+
+    def tier_table(self) -> Dict[str, Dict[str, int]]:
+        # Filas por tier (en orden), columnas por categoría
+        categories = sorted(self.by_category)
+        return {
+            name: {category: self.by_category_tier[category].get(name, 0) for category in categories}
+            for _, name, _ in TIERS
+            if self.by_tier.get(name)
+        }
+
+    def summary(self) -> Dict:
+        return {
+            "pulls": self.total,
+            "rarity_mean": self.rarity.mean,
+            "rarity_std": self.rarity.std,
+            "luck_mean": self.luck.mean,
+            "luck_std": self.luck.std,
+            "star_rate": self.star_rate,
+            "repeat_rate": self.repeat_rate,
+            "tp_earned": self.tp_earned,
+            "tp_spent": self.tp_spent,
+            "categories": dict(self.by_category),
+            "tiers": dict(self.by_tier),
+        }
@@ -0,0 +1,417 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from . import instrument
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+GACHA_LOG_DIR = "gacha_log"
+
+# Número de eventos en el journal a partir del cual se reescriben los snapshots
+COMPACT_EVERY = 5000
+
+
+class FlushReport:
+    # Lo que flush() tuvo que corregir al volver a validar contra el estado compartido:
+    # late_repeats: claves que esta sesión dio por nuevas pero otra escribió antes (ya con su +1 TP)
+    # rejected_spends: (posición entre los gastos del lote, coste) de los gastos que el saldo ya no cubría
+    __slots__ = ("late_repeats", "rejected_spends", "spends")
+
+    def __init__(self):
+        self.late_repeats: List[str] = []
+        self.rejected_spends: List[tuple] = []
+        self.spends = 0
+
+    def __bool__(self):
+        return bool(self.late_repeats or self.rejected_spends)
+
+
+def repeat_key(type_: str, element: str) -> str:
+    return f"{type_}::{element}"
+
+
+def profile_dir(profile: Optional[str] = None, log_dir: str = GACHA_LOG_DIR) -> str:
+    # Sin perfil se usa la carpeta de siempre; cada perfil tiene la suya
+    if not profile:
+        return log_dir
+    safe = re.sub(r"[^A-Za-z0-9_-]", "", profile)[:64]
+    return os.path.join(log_dir, "users", safe) if safe else log_dir
+
+
+class FileLock:
+    # Lock exclusivo entre procesos (y entre hilos con distinto descriptor) sobre un archivo
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        if msvcrt is not None:
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class JsonJournalStore:
+    # Snapshots repeats.json / points.json + journal de eventos solo-anexar.
+    # Varias instancias (sesiones o procesos) pueden compartir la carpeta: toda escritura
+    # se hace bajo un lock de archivo y antes se leen los eventos que añadieron las demás.
+    def __init__(self, log_dir: str = GACHA_LOG_DIR):
+        os.makedirs(log_dir, exist_ok=True)
+        self.repeats_file = os.path.join(log_dir, "repeats.json")
+        self.points_file = os.path.join(log_dir, "points.json")
+        self.journal_file = os.path.join(log_dir, "journal.jsonl")
+        self.lock_file = os.path.join(log_dir, ".lock")
+
+        self._lock = threading.RLock()
+        # Cambios locales aún no escritos en el journal
+        self._pending = []
+        self._pending_repeats = set()
+        self._pending_points = 0
+
+        with FileLock(self.lock_file):
+            self._reload(repair=True)
+
+    def _load_json(self, path: str, default):
+        try:
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception:
+            pass
+        return default
+
+    def _save_json(self, path: str, data):
+        # Escritura atómica: un corte a mitad nunca deja el snapshot a medias
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+            instrument.count("tracker.bytes_written", f.tell())
+        os.replace(tmp_path, path)
+
+    def _snapshot_stamp(self):
+        try:
+            stat = os.stat(self.points_file)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _reload(self, repair: bool = False):
+        self.repeats = self._load_json(self.repeats_file, default={})
+        self.points = self._load_json(self.points_file, default={"points": 0})
+        self.seq = self.points.get("seq", 0)
+        self._snapshot_seq = self.seq
+        self._stamp = self._snapshot_stamp()
+        self._journal_offset = 0
+        self._journal_events = 0
+        self._read_journal(repair)
+
+    def _read_journal(self, repair: bool = False):
+        # Recuperación tras un cierre inesperado: aplicar los eventos posteriores al snapshot
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, "rb") as f:
+            f.seek(self._journal_offset)
+            for raw in f:
+                try:
+                    if not raw.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    event = json.loads(raw)
+                except ValueError:
+                    # Última línea incompleta: se descarta (y se corta para no pegarle la siguiente)
+                    if repair:
+                        with open(self.journal_file, "r+b") as journal:
+                            journal.truncate(self._journal_offset)
+                    break
+                self._journal_offset += len(raw)
+                self._journal_events += 1
+                self._apply(event)
+
+    def _apply(self, event):
+        if event["op"] == "repeat":
+            self.repeats[event["key"]] = True
+        elif event["op"] == "points" and event["seq"] > self._snapshot_seq:
+            self.points["points"] = self.points.get("points", 0) + event["delta"]
+        self.seq = max(self.seq, event["seq"])
+
+    def _sync(self):
+        # Debe llamarse con el lock de archivo tomado. Con el lock nadie está escribiendo, así que una
+        # línea incompleta es de un proceso que murió a mitad: se corta aquí, antes de que el
+        # siguiente flush le pegue sus eventos detrás
+        try:
+            journal_size = os.path.getsize(self.journal_file)
+        except OSError:
+            journal_size = 0
+        if self._snapshot_stamp() != self._stamp or journal_size < self._journal_offset:
+            self._reload(repair=True)  # Otra instancia compactó o reinició el historial
+        else:
+            self._read_journal(repair=True)
+
+    def sync(self):
+        with self._lock, FileLock(self.lock_file):
+            self._sync()
+
+    def add_element(self, type_: str, element: str) -> bool:
+        key = repeat_key(type_, element)
+        with self._lock:
+            if key in self.repeats or key in self._pending_repeats:
+                return False
+            self._pending_repeats.add(key)
+            self._pending.append({"op": "repeat", "key": key})
+            return True
+
+    def get_points(self) -> int:
+        return self.points.get("points", 0) + self._pending_points
+
+    def add_points(self, delta: int, reason: str = ""):
+        with self._lock:
+            self._pending_points += delta
+            event = {"op": "points", "delta": delta}
+            if reason:
+                event["reason"] = reason
+            self._pending.append(event)
+
+    def spend_points(self, cost: int) -> bool:
+        # Comprobación optimista con el saldo de esta instancia; flush() la repite con el saldo compartido
+        with self._lock:
+            if self.get_points() >= cost:
+                self.add_points(-cost, "spend")
+                return True
+            return False
+
+    def _revalidate(self, report: FlushReport) -> list:
+        # Con el lock de archivo tomado y ya sincronizado: lo que otra instancia escribió mientras
+        # tanto puede invalidar eventos pendientes (mismo elemento nuevo, mismos TP gastados)
+        events = []
+        balance = self.points.get("points", 0)
+        for event in self._pending:
+            if event["op"] == "repeat" and event["key"] in self.repeats:
+                report.late_repeats.append(event["key"])
+                event = {"op": "points", "delta": 1, "reason": "repeat"}
+            elif event.get("reason") == "spend":
+                report.spends += 1
+                if balance + event["delta"] < 0:
+                    report.rejected_spends.append((report.spends - 1, -event["delta"]))
+                    continue
+            if event["op"] == "points":
+                balance += event["delta"]
+            events.append(event)
+        return events
+
+    def flush(self) -> FlushReport:
+        report = FlushReport()
+        with self._lock:
+            if not self._pending:
+                return report
+            with instrument.timer("tracker.flush"), FileLock(self.lock_file):
+                self._sync()
+                events = self._revalidate(report)
+                # Los seq se asignan bajo el lock para que sean crecientes entre instancias
+                lines = []
+                for event in events:
+                    self.seq += 1
+                    event["seq"] = self.seq
+                    self._apply(event)
+                    lines.append(json.dumps(event, ensure_ascii=False) + "\n")
+                data = "".join(lines).encode("utf-8")
+                with open(self.journal_file, "ab") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._journal_offset = f.tell()
+                self._journal_events += len(lines)
+                instrument.count("tracker.bytes_written", len(data))
+                instrument.count("tracker.events_written", len(lines))
+                self._clear_pending()
+                if self._journal_events >= COMPACT_EVERY:
+                    self._compact()
+        if report:
+            instrument.count("tracker.late_repeats", len(report.late_repeats))
+            instrument.count("tracker.rejected_spends", len(report.rejected_spends))
+        return report
+
+    def _clear_pending(self):
+        self._pending = []
+        self._pending_repeats = set()
+        self._pending_points = 0
+
+    def _compact(self):
+        # Los snapshots se escriben antes de vaciar el journal; el "seq" guardado en
+        # points.json evita aplicar dos veces los puntos si se corta entre ambos pasos
+        instrument.count("tracker.compactions")
+        self.points["seq"] = self.seq
+        self._save_json(self.repeats_file, self.repeats)
+        self._save_json(self.points_file, self.points)
+        with open(self.journal_file, "wb"):
+            pass
+        self._snapshot_seq = self.seq
+        self._stamp = self._snapshot_stamp()
+        self._journal_offset = 0
+        self._journal_events = 0
+
+    def compact(self):
+        with self._lock:
+            self.flush()
+            with FileLock(self.lock_file):
+                self._sync()
+                self._compact()
+
+    def replace_all(self, keys: Iterable[str], points: int):
+        with self._lock, FileLock(self.lock_file):
+            self._sync()
+            self.repeats = {key: True for key in keys}
+            self.points = {"points": points}
+            self._clear_pending()
+            self._compact()
+
+    def clear(self):
+        self.replace_all([], 0)
+
+    def close(self):
+        self.flush()
+
+
+class SQLiteStore:
+    # Tabla indexada (type, element), libro de puntos y saldo; modo WAL para varios procesos
+    def __init__(self, path: str = os.path.join(GACHA_LOG_DIR, "tracker.sqlite3"), timeout: float = 30.0):
+        import sqlite3  # solo con el backend SQLite
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        is_new = not os.path.exists(path)
+        # isolation_level=None: las transacciones se abren a mano con BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS repeats (
+                type TEXT NOT NULL,
+                element TEXT NOT NULL,
+                PRIMARY KEY (type, element)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS points_ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                delta INTEGER NOT NULL,
+                reason TEXT NOT NULL DEFAULT '',
+                ts REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS balance (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                points INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO balance (id, points) VALUES (1, 0);
+        """)
+        if is_new:
+            self._import_json_snapshots(os.path.dirname(path) or ".")
+
+    def _import_json_snapshots(self, log_dir: str):
+        # Primera vez con SQLite: migrar el estado guardado por el backend JSON
+        legacy = JsonJournalStore(log_dir)
+        if legacy.repeats or legacy.get_points():
+            self.replace_all(legacy.repeats.keys(), legacy.get_points())
+
+    def _begin(self):
+        # Una transacción por lote (multi-roll); se confirma en flush()
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+
+    def sync(self):
+        # Las lecturas siempre van a la base compartida; no hay nada que ponerse al día
+        pass
+
+    def add_element(self, type_: str, element: str) -> bool:
+        with self._lock:
+            self._begin()
+            cur = self.conn.execute("INSERT OR IGNORE INTO repeats (type, element) VALUES (?, ?)", (type_, element))
+            return cur.rowcount == 1
+
+    def get_points(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT points FROM balance WHERE id = 1").fetchone()[0]
+
+    def add_points(self, delta: int, reason: str = ""):
+        with self._lock:
+            self._begin()
+            self.conn.execute("INSERT INTO points_ledger (delta, reason, ts) VALUES (?, ?, ?)",
+                              (delta, reason, time.time()))
+            self.conn.execute("UPDATE balance SET points = points + ? WHERE id = 1", (delta,))
+
+    def spend_points(self, cost: int) -> bool:
+        # Comprobación y descuento en una sola sentencia para que otro proceso no gaste lo mismo
+        with self._lock:
+            self._begin()
+            cur = self.conn.execute("UPDATE balance SET points = points - ? WHERE id = 1 AND points >= ?",
+                                    (cost, cost))
+            if cur.rowcount != 1:
+                return False
+            self.conn.execute("INSERT INTO points_ledger (delta, reason, ts) VALUES (?, 'spend', ?)",
+                              (-cost, time.time()))
+            return True
+
+    def flush(self) -> FlushReport:
+        # Aquí no hay nada que corregir: repetidos y gastos ya se validan dentro de la transacción
+        with self._lock:
+            if self.conn.in_transaction:
+                with instrument.timer("tracker.flush"):
+                    self.conn.execute("COMMIT")
+        return FlushReport()
+
+    def replace_all(self, keys: Iterable[str], points: int):
+        with self._lock:
+            self._begin()
+            self.conn.execute("DELETE FROM repeats")
+            self.conn.execute("DELETE FROM points_ledger")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO repeats (type, element) VALUES (?, ?)",
+                (key.split("::", 1) for key in keys)
+            )
+            self.conn.execute("INSERT INTO points_ledger (delta, reason, ts) VALUES (?, 'load', ?)",
+                              (points, time.time()))
+            self.conn.execute("UPDATE balance SET points = ? WHERE id = 1", (points,))
+            self.flush()
+
+    def clear(self):
+        self.replace_all([], 0)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.conn.close()
+
+
+def make_store(backend: Optional[str] = None, log_dir: str = GACHA_LOG_DIR):
+    backend = (backend or os.environ.get("GACHA_TRACKER_BACKEND", "json")).lower()
+    if backend == "sqlite":
+        return SQLiteStore(os.path.join(log_dir, "tracker.sqlite3"))
+    if backend == "json":
+        return JsonJournalStore(log_dir)
+    raise ValueError(f"Unknown tracker backend: {backend}")
@@ -1,71 +1,64 @@
-import os
-import json
 import re
-from typing import List, Dict
+from typing import Dict, Optional
 
-GACHA_LOG_DIR = "gacha_log"
-REPEATS_FILE = os.path.join(GACHA_LOG_DIR, "repeats.json")
-POINTS_FILE = os.path.join(GACHA_LOG_DIR, "points.json")
+from .storage import make_store, profile_dir, repeat_key
 
 class GachaHistoryTracker:
-    def __init__(self):
-        os.makedirs(GACHA_LOG_DIR, exist_ok=True)
-        self.repeats = self._load_json(REPEATS_FILE, default={})
-        self.points = self._load_json(POINTS_FILE, default={"points": 0})
+    # El almacenamiento es intercambiable: JSON + journal (por defecto) o SQLite.
+    # Cada sesión crea su propia instancia; el store se encarga del bloqueo compartido.
+    def __init__(self, store=None, profile: Optional[str] = None):
+        self.profile = profile
+        self.store = store if store is not None else make_store(log_dir=profile_dir(profile))
 
-    def _load_json(self, path: str, default):
-        try:
-            if os.path.exists(path):
-                with open(path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-        except Exception:
-            pass
-        return default
+    def sync(self):
+        # Ponerse al día con lo que hayan escrito otras sesiones/procesos
+        self.store.sync()
 
-    def _save_json(self, path: str, data):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+    def flush(self):
+        # Devuelve el FlushReport del store: repetidos y gastos corregidos al validar contra lo compartido
+        return self.store.flush()
 
     def check_repeat(self, pull: Dict) -> bool:
-        key = f"{pull['Type']}::{pull['Element']}"
-        if key in self.repeats:
-            self.points["points"] += 1
-            self._save_json(POINTS_FILE, self.points)
-            return True
-        self.repeats[key] = True
-        self._save_json(REPEATS_FILE, self.repeats)
-        return False
+        return self.check_element(pull["Type"], pull["Element"])
+
+    def check_element(self, type_: str, element: str) -> bool:
+        if self.store.add_element(type_, element):
+            return False
+        self.store.add_points(1, "repeat")
+        return True
 
     def get_points(self) -> int:
-        return self.points.get("points", 0)
+        return self.store.get_points()
 
     def spend_points(self, cost: int) -> bool:
-        if self.points["points"] >= cost:
-            self.points["points"] -= cost
-            self._save_json(POINTS_FILE, self.points)
-            return True
-        return False
+        return self.store.spend_points(cost)
     def clear_all(self):
-            self.repeats = {}
-            self.points = {"points": 0}
-            self._save_json(REPEATS_FILE, self.repeats)
-            self._save_json(POINTS_FILE, self.points)
-    def load_from_log(self, log: List[Dict]):
-        self.repeats = {f"{entry['Type']}::{entry['Element']}": True for entry in log}
-        self._save_json(REPEATS_FILE, self.repeats)
+            self.store.clear()
+    def replace_all(self, keys, points: int):
+        # Sustituye repetidos y TP de una vez (importaciones): si la lectura falla antes, nada cambia
+        self.store.replace_all(keys, points)
+
+
+def entry_key(entry: Dict) -> str:
+    return repeat_key(entry["Type"], entry["Element"])
+
 
-        total_points = 0
-        for entry in log:
-            notes = str(entry.get("Notes", "")).strip()
+def entry_tp_delta(entry: Dict) -> int:
+    # Las tiradas nuevas guardan el cambio de TP como campo numérico
+    delta = entry.get("TPDelta")
+    if delta is not None and delta == delta and str(delta).strip() != "":
+        return int(float(delta))
 
-        # Aceptar variantes de "Repeated" aunque el emoji esté dañado
-            if "Repeated" in notes:
-                total_points += 1
+    # Historiales antiguos: derivarlo de las notas
+    notes = str(entry.get("Notes", "")).strip()
+    total_points = 0
 
-        # Aceptar cualquier "- X TP"
-            match = re.search(r"-\s*(\d+)\s*TP", notes)
-            if match:
-                total_points -= int(match.group(1))
+    # Aceptar variantes de "Repeated" aunque el emoji esté dañado
+    if "Repeated" in notes:
+        total_points += 1
 
-        self.points = {"points": total_points}
-        self._save_json(POINTS_FILE, self.points)
+    # Aceptar cualquier "- X TP"
+    match = re.search(r"-\s*(\d+)\s*TP", notes)
+    if match:
+        total_points -= int(match.group(1))
+    return total_points
@@ -1,35 +1,49 @@
 import math
 
+TIERS = [
+    (1.0, 'Trash', '#a39589'),
+    (2.0, 'Common', '#9c7e5a'),
+    (3.0, 'Uncommon', '#aed1d1'),
+    (4.0, 'Rare', '#11d939'),
+    (5.0, 'Elite', '#1172d9'),
+    (6.0, 'Epic', '#6811d9'),
+    (7.0, 'Legendary', '#f7d40a'),
+    (8.0, 'Mythical', '#fc61ff'),
+    (9.0, 'Divine', '#ff8c00'),
+    (10.0, 'Transcendent', '#ff0000'),
+]
+
+# (umbral, clase): la suerte se clasifica por el primer umbral que supera
+LUCK_CLASSES = [
+    (95, "Below Average"),
+    (75, "Average"),
+    (55, "Above Average"),
+    (35, "Notable"),
+    (15, "Rare"),
+    (5, "Exceptional Pull"),
+]
+LUCK_FLOOR_CLASS = "Mythic Pull"
+
+# (min, avg, max) y color de cada preset de rareza
+PRESETS = {
+    "Bronze": ((0.1, 1.3, 3.3), "#cd7f32"),
+    "Silver": ((0.5, 2.3, 4.3), "#c0c0c0"),
+    "Gold": ((1.5, 3.3, 5.3), "#ffd700"),
+    "Platinum": ((2.5, 4.3, 6.3), "#e5e4e2"),
+    "Diamond": ((3.5, 5.3, 7.3), "#b9f2ff"),
+    "Legendary": ((4.5, 6.3, 8.3), "#f7d40a"),
+    "Mythical": ((5.5, 7.3, 9.3), "#fc61ff"),
+    "Divine": ((6.5, 8.3, 10.0), "#ff8c00"),
+}
+
 def get_tier_and_color(rarity):
-    tiers = [
-        (1.0, 'Trash', '#a39589'),
-        (2.0, 'Common', '#9c7e5a'),
-        (3.0, 'Uncommon', '#aed1d1'),
-        (4.0, 'Rare', '#11d939'),
-        (5.0, 'Elite', '#1172d9'),
-        (6.0, 'Epic', '#6811d9'),
-        (7.0, 'Legendary', '#f7d40a'),
-        (8.0, 'Mythical', '#fc61ff'),
-        (9.0, 'Divine', '#ff8c00'),
-        (10.0, 'Transcendent', '#ff0000'),
-    ]
-    for limit, name, color in tiers:
+    for limit, name, color in TIERS:
         if rarity < limit:
             return name, color
     return "Transcendent", "#ff0000"
 
 def classify_luck(luck_value):
-    if luck_value > 95:
-        return "Below Average"
-    elif luck_value > 75:
-        return "Average"
-    elif luck_value > 55:
-        return "Above Average"
-    elif luck_value > 35:
-        return "Notable"
-    elif luck_value > 15:
-        return "Rare"
-    elif luck_value > 5:
-        return "Exceptional Pull"
-    else:
-        return "Mythic Pull"
\ No newline at end of file
+    for threshold, name in LUCK_CLASSES:
+        if luck_value > threshold:
+            return name
+    return LUCK_FLOOR_CLASS
@@ -0,0 +1,230 @@
+# Almacén de versiones guardadas de los gachafiles, direccionado por contenido.
+# Cada versión distinta se guarda una sola vez (blob con nombre = sha256 del contenido) y, salvo cada
+# KEYFRAME_EVERY versiones, como diferencias por líneas respecto a la versión anterior de su categoría.
+# index.json guarda (categoría, timestamp, hash): listar versiones solo lee ese archivo.
+import json
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+
+from .storage import FileLock
+
+VERSIONS_DIR = "gachafiles_versions"
+INDEX_FILE = "index.json"
+OBJECTS_DIR = "objects"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# Cada cuántas diferencias encadenadas se guarda una copia completa (limita el coste de restaurar)
+KEYFRAME_EVERY = 20
+
+# Copias completas del formato anterior: <Categoría>_<timestamp>.txt
+LEGACY_RE = re.compile(r"^([A-Za-z]+)_(\d{8}_\d{6})\.txt$")
+
+
+class VersionEntry(NamedTuple):
+    category: str
+    timestamp: str
+    hash: str
+
+    @property
+    def name(self) -> str:
+        # Mismo nombre que tenían los archivos de versión (descargas y mensajes)
+        return f"{self.category}_{self.timestamp}.txt"
+
+    @property
+    def key(self) -> str:
+        return f"{self.timestamp}_{self.hash[:12]}"
+
+
+def content_hash(content: str) -> str:
+    # hashlib y difflib se cargan al guardar o restaurar, no al listar (arranque de la app)
+    import hashlib
+
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def make_delta(base_lines: List[str], lines: List[str]) -> list:
+    # ["=", i1, i2] copia base[i1:i2]; ["+", ...] son líneas nuevas; lo borrado no se guarda
+    import difflib
+
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i1, i2])
+        elif j2 > j1:
+            ops.append(["+", *lines[j1:j2]])
+    return ops
+
+
+def apply_delta(base_lines: List[str], ops: list) -> List[str]:
+    lines = []
+    for op in ops:
+        if op[0] == "=":
+            lines.extend(base_lines[op[1]:op[2]])
+        else:
+            lines.extend(op[1:])
+    return lines
+
+
+class VersionStore:
+    def __init__(self, folder: str = VERSIONS_DIR):
+        self.folder = folder
+        self.index_file = os.path.join(folder, INDEX_FILE)
+        self.objects_dir = os.path.join(folder, OBJECTS_DIR)
+        self.lock_file = os.path.join(folder, ".lock")
+        self._lock = threading.RLock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        if self._legacy_files():
+            self.migrate_legacy()
+
+    # --- índice ---
+
+    def _read_index(self) -> List[VersionEntry]:
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                return [VersionEntry(*row) for row in json.load(f)]
+        except FileNotFoundError:
+            return []
+
+    def _write_index(self, entries: List[VersionEntry]):
+        # Escritura atómica, igual que los snapshots del tracker
+        tmp_path = self.index_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([list(entry) for entry in entries], f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_file)
+
+    def entries(self, category: Optional[str] = None) -> List[VersionEntry]:
+        # Más recientes primero
+        entries = [e for e in self._read_index() if category is None or e.category == category]
+        return sorted(entries, key=lambda e: e.timestamp, reverse=True)
+
+    # --- blobs ---
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _read_blob(self, digest: str) -> dict:
+        with open(self._blob_path(digest), "rb") as f:
+            return json.loads(zlib.decompress(f.read()).decode("utf-8"))
+
+    def _write_blob(self, digest: str, blob: dict):
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(json.dumps(blob, ensure_ascii=False).encode("utf-8")))
+        os.replace(tmp_path, path)
+
+    def read(self, digest: str) -> str:
+        # Reconstrucción: se baja por la cadena de bases hasta una copia completa y se aplican
+        # las diferencias de vuelta
+        chain = []
+        blob = self._read_blob(digest)
+        while blob["base"] is not None:
+            chain.append(blob["ops"])
+            blob = self._read_blob(blob["base"])
+        lines = blob["lines"]
+        for ops in reversed(chain):
+            lines = apply_delta(lines, ops)
+        content = "".join(lines)
+        if content_hash(content) != digest:
+            raise ValueError(f"Version {digest[:12]} is corrupted")
+        return content
+
+    def _store_content(self, content: str, base: Optional[str]) -> str:
+        digest = content_hash(content)
+        if os.path.exists(self._blob_path(digest)):
+            return digest  # contenido ya guardado: no se duplica
+
+        lines = content.splitlines(keepends=True)
+        blob = {"base": None, "depth": 0, "lines": lines}
+        if base is not None and os.path.exists(self._blob_path(base)):
+            depth = self._read_blob(base)["depth"] + 1
+            if depth < KEYFRAME_EVERY:
+                ops = make_delta(self.read(base).splitlines(keepends=True), lines)
+                # Si el diff no ahorra nada (archivo reescrito entero) se guarda la copia completa
+                if sum(len(op) for op in ops) < len(lines):
+                    blob = {"base": base, "depth": depth, "ops": ops}
+        self._write_blob(digest, blob)
+        return digest
+
+    # --- operaciones ---
+
+    def save(self, category: str, content: str, timestamp: Optional[str] = None) -> VersionEntry:
+        timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+        with self._lock, FileLock(self.lock_file):
+            entries = self._read_index()
+            previous = [e for e in entries if e.category == category]
+            latest = max(previous, key=lambda e: e.timestamp) if previous else None
+            digest = self._store_content(content, latest.hash if latest else None)
+            # Guardar dos veces seguidas el mismo contenido no crea otra versión
+            if latest is not None and latest.hash == digest:
+                return latest
+            entry = VersionEntry(category, timestamp, digest)
+            entries.append(entry)
+            self._write_index(entries)
+            return entry
+
+    def delete(self, entries: Iterable[VersionEntry]) -> int:
+        targets = set(entries)
+        with self._lock, FileLock(self.lock_file):
+            current = self._read_index()
+            remaining = [e for e in current if e not in targets]
+            self._write_index(remaining)
+            self._prune(remaining)
+            return len(current) - len(remaining)
+
+    def delete_all(self, category: Optional[str] = None) -> int:
+        return self.delete(self.entries(category))
+
+    def _prune(self, entries: List[VersionEntry]):
+        # Se conservan los blobs de las versiones del índice y todas sus bases
+        keep = set()
+        for entry in entries:
+            digest = entry.hash
+            while digest is not None and digest not in keep:
+                keep.add(digest)
+                digest = self._read_blob(digest)["base"]
+        for sub in os.listdir(self.objects_dir):
+            sub_dir = os.path.join(self.objects_dir, sub)
+            for name in os.listdir(sub_dir):
+                if name not in keep:
+                    os.remove(os.path.join(sub_dir, name))
+
+    # --- migración ---
+
+    def _legacy_files(self) -> List[str]:
+        return sorted((f for f in os.listdir(self.folder) if LEGACY_RE.match(f)),
+                      key=lambda f: LEGACY_RE.match(f).group(2))
+
+    def migrate_legacy(self) -> int:
+        # Importa las copias completas antiguas en orden cronológico y las borra
+        migrated = 0
+        for name in self._legacy_files():
+            category, timestamp = LEGACY_RE.match(name).groups()
+            path = os.path.join(self.folder, name)
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                content = f.read()
+            self.save(category, content, timestamp)
+            os.remove(path)
+            migrated += 1
+        return migrated
+
+
+# Un almacén por carpeta para todo el proceso: la migración se hace una sola vez
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_version_store(folder: str = VERSIONS_DIR) -> VersionStore:
+    with _stores_lock:
+        store = _stores.get(folder)
+        if store is None:
+            store = _stores[folder] = VersionStore(folder)
+        return store
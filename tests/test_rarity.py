@@ -0,0 +1,78 @@
+import random
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+from logic.rarity import RarityDistribution, ndtri
+
+# Las rarezas se redondean a 0.01: la CDF empírica se compara contra la exacta a ±media cubeta
+HALF_STEP = 0.005
+
+SETTINGS = [
+    # (min, max, avg, skew)
+    (0.0, 10.0, 5.0, 0.0),
+    (1.0, 6.0, 4.0, 0.5),
+    (2.0, 9.0, 7.5, -0.6),
+    (9.0, 10.0, 1.0, 0.0),  # intervalo muy por encima del centro: cola superior
+    (0.0, 1.0, 9.0, 0.0),  # intervalo muy por debajo del centro: cola inferior
+    (9.0, 10.0, 1.0, 0.7),
+]
+
+
+def check_against_cdf(dist, values, tolerance):
+    values = np.sort(np.asarray(values))
+    for x in np.linspace(dist.min_val, dist.max_val, 41):
+        empirical = np.searchsorted(values, x, side="right") / len(values)
+        assert dist.cdf(x - HALF_STEP) - tolerance <= empirical <= dist.cdf(x + HALF_STEP) + tolerance
+
+
+def test_ndtri_matches_inv_cdf():
+    normal = NormalDist()
+    p = np.concatenate([
+        [1e-300, 1e-100, 1e-20, 1e-9, 1e-5],
+        np.linspace(0.001, 0.999, 999),
+        [1 - 1e-5, 1 - 1e-9, 1 - 1e-12],
+    ])
+    expected = np.array([normal.inv_cdf(v) for v in p])
+    np.testing.assert_allclose(ndtri(p), expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("min_val, max_val, avg, skew", SETTINGS)
+def test_sample_array_matches_cdf(min_val, max_val, avg, skew):
+    dist = RarityDistribution(min_val, max_val, avg, skew=skew, bonus_chance=0.0)
+    values = dist.sample_array(np.random.default_rng(1), 40000)
+    assert values.min() >= min_val and values.max() <= max_val
+    check_against_cdf(dist, values, 0.015)
+
+
+@pytest.mark.parametrize("min_val, max_val, avg, skew", SETTINGS)
+def test_sample_matches_cdf(min_val, max_val, avg, skew):
+    dist = RarityDistribution(min_val, max_val, avg, skew=skew, bonus_chance=0.0)
+    rng = random.Random(2)
+    values = [dist.sample(rng) for _ in range(8000)]
+    assert min(values) >= min_val and max(values) <= max_val
+    check_against_cdf(dist, values, 0.03)
+
+
+@pytest.mark.parametrize("min_val, max_val, avg", [(0.0, 10.0, 5.0), (9.0, 10.0, 1.0), (3.0, 3.0, 8.0)])
+def test_sample_uses_three_numbers(min_val, max_val, avg):
+    # Siempre tres números por tirada (bonus, desplazamiento, posición): la secuencia es reproducible
+    dist = RarityDistribution(min_val, max_val, avg, bonus_chance=0.5)
+    rng, reference = random.Random(3), random.Random(3)
+    for _ in range(50):
+        dist.sample(rng)
+        reference.random(), reference.uniform(0.1, dist.bonus_max), reference.random()
+    assert rng.random() == reference.random()
+
+
+def test_bonus_stays_within_bounds():
+    dist = RarityDistribution(2.0, 4.0, 3.9, bonus_chance=1.0, bonus_max=5.0)
+    values = dist.sample_array(np.random.default_rng(4), 10000)
+    assert values.min() >= 2.0 and values.max() <= 4.0
+
+
+def test_min_equals_max_is_point_mass():
+    dist = RarityDistribution(3.0, 3.0, 8.0)
+    assert dist.sample(random.Random(5)) == 3.0
+    assert set(dist.sample_array(np.random.default_rng(5), 100)) == {3.0}
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from logic import storage
+from logic.storage import JsonJournalStore, repeat_key
+
+
+def journal_lines(store):
+    with open(store.journal_file, "rb") as f:
+        return f.read().splitlines(keepends=True)
+
+
+def test_torn_line_with_live_instance(tmp_path):
+    first = JsonJournalStore(str(tmp_path))
+    second = JsonJournalStore(str(tmp_path))
+    first.add_points(1)
+    first.flush()
+
+    # Un tercer proceso muere a mitad de escribir su línea
+    with open(first.journal_file, "ab") as f:
+        f.write(b'{"op": "points", "delta": 100')
+
+    second.add_points(5)
+    second.flush()
+    first.add_points(7)
+    first.flush()
+
+    for line in journal_lines(first):
+        assert line.endswith(b"\n")
+        json.loads(line)
+    first.sync()
+    second.sync()
+    assert first.get_points() == second.get_points() == 13
+    assert JsonJournalStore(str(tmp_path)).get_points() == 13
+
+
+def test_crash_between_snapshot_and_truncate(tmp_path, monkeypatch):
+    store = JsonJournalStore(str(tmp_path))
+    store.add_element("Ability", "Fire")
+    store.add_points(3)
+    store.add_points(4)
+    store.flush()
+
+    # Los snapshots se escriben pero el journal no llega a vaciarse
+    def crash_on_truncate(path, mode="r", *args, **kwargs):
+        if path == store.journal_file and mode == "wb":
+            raise OSError("crash")
+        return open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(storage, "open", crash_on_truncate, raising=False)
+    with pytest.raises(OSError):
+        store.compact()
+    monkeypatch.undo()
+    assert len(journal_lines(store)) == 3
+
+    restarted = JsonJournalStore(str(tmp_path))
+    assert restarted.get_points() == 7
+    assert repeat_key("Ability", "Fire") in restarted.repeats
+
+    # Los eventos posteriores al snapshot sí se aplican
+    restarted.add_points(2)
+    restarted.flush()
+    assert JsonJournalStore(str(tmp_path)).get_points() == 9
+
+
+def test_flush_rejects_double_spend(tmp_path):
+    first = JsonJournalStore(str(tmp_path))
+    first.add_points(300)
+    first.flush()
+    second = JsonJournalStore(str(tmp_path))
+
+    assert first.spend_points(300) and second.spend_points(300)
+    assert first.flush().rejected_spends == []
+    assert second.flush().rejected_spends == [(0, 300)]
+    assert second.get_points() == 0
+    assert JsonJournalStore(str(tmp_path)).get_points() == 0
+
+
+def test_flush_reports_late_repeat(tmp_path):
+    first = JsonJournalStore(str(tmp_path))
+    second = JsonJournalStore(str(tmp_path))
+
+    assert first.add_element("Item", "Sword") and second.add_element("Item", "Sword")
+    assert first.flush().late_repeats == []
+    assert second.flush().late_repeats == [repeat_key("Item", "Sword")]
+    restarted = JsonJournalStore(str(tmp_path))
+    assert restarted.get_points() == 1
+    assert list(restarted.repeats) == [repeat_key("Item", "Sword")]
@@ -0,0 +1,83 @@
+import os
+
+from logic.versions import KEYFRAME_EVERY, VersionStore
+
+
+def make_content(n):
+    # Un gachafile pequeño que cambia una línea por versión
+    lines = [f"{i}. Element {i},{i % 10}.5\n" for i in range(1, 40)]
+    lines[n % len(lines)] = f"{n}. Edited {n},1.0\n"
+    return "".join(lines)
+
+
+def blob_count(store):
+    return sum(len(files) for _, _, files in os.walk(store.objects_dir))
+
+
+def timestamp(n):
+    return f"20240101_{n:06d}"
+
+
+def test_round_trip_across_keyframes(tmp_path):
+    store = VersionStore(str(tmp_path))
+    contents = [make_content(n) for n in range(2 * KEYFRAME_EVERY + 5)]
+    entries = [store.save("Ability", content, timestamp(n)) for n, content in enumerate(contents)]
+
+    for entry, content in zip(entries, contents):
+        assert store.read(entry.hash) == content
+
+    # Las diferencias se encadenan y cada KEYFRAME_EVERY versiones hay una copia completa
+    depths = [store._read_blob(entry.hash)["depth"] for entry in entries]
+    assert depths[:KEYFRAME_EVERY] == list(range(KEYFRAME_EVERY))
+    assert depths[KEYFRAME_EVERY] == 0
+    assert max(depths) < KEYFRAME_EVERY
+
+
+def test_identical_save_is_deduplicated(tmp_path):
+    store = VersionStore(str(tmp_path))
+    first = store.save("Ability", make_content(1), timestamp(1))
+    again = store.save("Ability", make_content(1), timestamp(2))
+    assert again == first
+    assert len(store.entries("Ability")) == 1
+    assert blob_count(store) == 1
+
+
+def test_delete_keeps_bases_of_remaining_versions(tmp_path):
+    store = VersionStore(str(tmp_path))
+    contents = [make_content(n) for n in range(6)]
+    entries = [store.save("Ability", content, timestamp(n)) for n, content in enumerate(contents)]
+    other = store.save("Item", "1. Sword,2.0\n", timestamp(10))
+
+    assert store.delete(entries[:3]) == 3
+    assert [e.timestamp for e in store.entries("Ability")] == [timestamp(n) for n in (5, 4, 3)]
+    for entry, content in zip(entries[3:], contents[3:]):
+        assert store.read(entry.hash) == content
+    assert store.read(other.hash) == "1. Sword,2.0\n"
+
+    assert store.delete_all("Ability") == 3
+    assert store.entries() == [other]
+    assert store.delete_all() == 1
+    assert blob_count(store) == 0
+
+
+def test_migrate_legacy_files(tmp_path):
+    old = make_content(1)
+    new = make_content(2)
+    (tmp_path / "Ability_20230102_000000.txt").write_text(new, encoding="utf-8")
+    (tmp_path / "Ability_20230101_000000.txt").write_text(old, encoding="utf-8")
+    (tmp_path / "Item_20230101_120000.txt").write_text("1. Sword,2.0\r\n", encoding="utf-8", newline="")
+    (tmp_path / "notes.txt").write_text("keep me", encoding="utf-8")
+
+    store = VersionStore(str(tmp_path))
+
+    assert [e.name for e in store.entries("Ability")] == ["Ability_20230102_000000.txt",
+                                                          "Ability_20230101_000000.txt"]
+    latest, previous = store.entries("Ability")
+    assert store.read(latest.hash) == new
+    assert store.read(previous.hash) == old
+    # Los finales de línea se conservan tal cual
+    assert store.read(store.entries("Item")[0].hash) == "1. Sword,2.0\r\n"
+
+    assert sorted(os.listdir(tmp_path)) == [".lock", "index.json", "notes.txt", "objects"]
+    # Reabrir no vuelve a importar nada
+    assert len(VersionStore(str(tmp_path)).entries()) == 3